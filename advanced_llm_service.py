@@ -2,23 +2,128 @@
 Advanced LLM Service with job processing and documentation generation
 Integrated from COBOL Intelligence Agent features
 """
+from __future__ import annotations
+
 import os
-import json
+import re
+import hashlib
 import uuid
 import time
-import requests
-from typing import Dict, Any, Optional
+import atexit
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from datetime import datetime
 import logging
 
+from json_codec import dump_json, load_json
+from process_pool import get_process_pool
+
+_TERMINAL_STATUSES = ("completed", "failed")
+
+# Job file reads are cached briefly so status polling does not re-read the
+# file every time; completed jobs never change and are kept much longer.
+_STATUS_CACHE_MAX = 4096
+_STATUS_CACHE_TTL = 2.0
+_COMPLETED_STATUS_CACHE_TTL = 300.0
+
+# Decision keywords as whole COBOL words; hyphens count as word characters so
+# scope terminators such as END-IF and names like VERIFY-IF are not counted.
+_DECISION_KEYWORD_RE = re.compile(
+    r'(?<![\w-])(?:IF|PERFORM|EVALUATE|WHEN)(?![\w-])', re.IGNORECASE
+)
+
+_SUMMARY_TEMPLATE = (
+    "Program Overview:\n"
+    "- Program ID: {program_id}\n"
+    "- Total Lines: {total_lines}\n"
+    "- Procedures: {paragraph_count}\n"
+    "- Complexity: {complexity_rating}\n"
+    "- Maintainability Score: {maintainability_score}/100"
+)
+
+# Upper bound on job files written (and indexed together) per flush batch
+_FLUSH_BATCH_SIZE = 64
+
+# Lightweight index of job files so listing jobs never parses job payloads
+_JOB_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id TEXT,
+    created_at REAL,
+    status TEXT,
+    filename TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_user_created ON jobs (user_id, created_at DESC);
+"""
+
+_JOB_INDEX_COLUMNS = ("job_id", "user_id", "created_at", "status", "filename")
+_JOB_INDEX_UPSERT = "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)"
+
+
+def _index_row(job_data: dict) -> tuple:
+    """Project a job document onto the job index columns"""
+    return tuple(job_data.get(column) for column in _JOB_INDEX_COLUMNS)
+
+
+def _process_alive(pid: int) -> bool:
+    """Report whether a process with this pid is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+# Service instance owned by a job pool worker process, built on first use
+_worker_service = None
+
+
+def _process_cobol_job_worker(job_data: dict, cobol_code: str, upload_folder: str):
+    """Run an analysis job inside a job pool worker process"""
+    global _worker_service
+    if _worker_service is None or _worker_service.upload_folder != upload_folder:
+        _worker_service = AdvancedLLMService(upload_folder)
+    
+    job_id = job_data["job_id"]
+    # From here on this process reports the job's outcome
+    job_data["owner_pid"] = os.getpid()
+    _worker_service._put_job(job_id, job_data)
+    _worker_service._process_cobol_job(job_id, cobol_code)
+    
+    # Progress is reported through the job file, so it must be on disk
+    # before the worker picks up the next job.
+    _worker_service._wait_for_flush()
+    _worker_service.jobs.pop(job_id, None)
+
+
 class AdvancedLLMService:
     """Enhanced LLM service with job processing and documentation generation"""
     
-    def __init__(self):
-        self.upload_folder = 'uploads'
-        self.jobs = {}  # In production, this would be a database
+    def __init__(self, upload_folder: str = 'uploads'):
+        self.upload_folder = upload_folder
+        # Recently used jobs, least recent first; evicted jobs stay on disk
+        # and are reloaded by get_job_status
+        self.jobs = OrderedDict()
+        self._jobs_max = 512
+        self._jobs_lock = threading.Lock()
+        self._index_path = os.path.join(upload_folder, 'jobs.db')
+        self._index_ready = False
+        self._index_lock = threading.Lock()
+        
+        # Job files are flushed in the background by a single drain task;
+        # only the newest snapshot of each job is written, so back-to-back
+        # stage updates coalesce, and each batch is indexed in one transaction.
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-flush")
+        self._pending = {}  # job_id -> latest snapshot awaiting write
+        self._flush_future = None  # drain task currently scheduled or running
+        self._lock = threading.Lock()
+        self._status_cache = {}  # job_id -> (expires_at, job_data) read from disk
+        atexit.register(self._io_pool.shutdown, wait=True)
         
-    def create_analysis_job(self, cobol_code: str, filename: str, user_id: str = None) -> str:
+    def create_analysis_job(self, cobol_code: str, filename: str, user_id: str | None = None) -> str:
         """Create a new analysis job for COBOL code"""
         job_id = str(uuid.uuid4())
         
@@ -37,65 +142,88 @@ class AdvancedLLMService:
                 "documentation_generation"
             ],
             "current_stage": "parsing",
+            "owner_pid": os.getpid(),
             "results": {}
         }
         
         # Store job metadata
-        self.jobs[job_id] = job_data
-        job_file = os.path.join(self.upload_folder, f"{job_id}.json")
-        with open(job_file, 'w') as f:
-            json.dump(job_data, f, indent=2)
+        self._put_job(job_id, job_data)
+        self._write_job_file(job_id, job_data)
+        self._index_jobs([job_data])
             
-        # Start processing
-        self._process_cobol_job(job_id, cobol_code)
+        # Hand off to the job pool; the worker reports progress via the job file
+        future = get_process_pool().submit(
+            _process_cobol_job_worker, job_data, cobol_code, self.upload_folder
+        )
+        future.add_done_callback(lambda f: self._on_job_done(job_id, f))
         
         return job_id
     
+    def _on_job_done(self, job_id: str, future):
+        """Mark a job as failed if its worker process died"""
+        error = future.exception()
+        if error is None:
+            return
+        logging.error(f"Job {job_id} worker failed: {str(error)}")
+        job_data = self.get_job_status(job_id) or self.jobs.get(job_id, {"job_id": job_id})
+        job_data["status"] = "failed"
+        job_data["error"] = str(error)
+        self._update_job(job_id, job_data)
+    
+    def fail_orphaned_jobs(self) -> int:
+        """Mark unfinished jobs failed when the process that owned them has exited
+        
+        A worker recycled or killed mid-job never reports the outcome, so its
+        jobs would otherwise stay queued or running forever. Run once at
+        startup, before any worker takes jobs.
+        """
+        placeholders = ", ".join("?" * len(_TERMINAL_STATUSES))
+        conn = self._index_connection()
+        try:
+            rows = conn.execute(
+                f"SELECT job_id FROM jobs WHERE status NOT IN ({placeholders})", _TERMINAL_STATUSES
+            ).fetchall()
+        finally:
+            conn.close()
+        
+        orphaned = []
+        for (job_id,) in rows:
+            try:
+                with open(os.path.join(self.upload_folder, f"{job_id}.json"), 'rb') as f:
+                    job_data = load_json(f.read())
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logging.error(f"Error loading job file for {job_id}: {e}")
+                continue
+            
+            owner_pid = job_data.get("owner_pid")
+            if job_data.get("status") in _TERMINAL_STATUSES or (owner_pid and _process_alive(owner_pid)):
+                continue
+            job_data["status"] = "failed"
+            job_data["error"] = "Job was interrupted before it finished"
+            # Written directly: this runs before workers fork, and the
+            # background flush thread would not survive the fork
+            self._write_job_file(job_id, job_data)
+            orphaned.append(job_data)
+        
+        if orphaned:
+            self._index_jobs(orphaned)
+            logging.warning(f"Marked {len(orphaned)} orphaned jobs as failed")
+        return len(orphaned)
+    
     def _process_cobol_job(self, job_id: str, cobol_code: str):
         """Process COBOL code analysis job"""
         try:
             job_data = self.jobs[job_id]
             
-            # Stage 1: Parsing
-            job_data["current_stage"] = "parsing"
-            job_data["progress"] = 20
-            self._update_job(job_id, job_data)
-            
-            from cobol_parser import parse_cobol_to_ast
-            ast_result = parse_cobol_to_ast(cobol_code)
-            job_data["results"]["ast"] = ast_result
-            
-            # Stage 2: Structure Analysis
-            job_data["current_stage"] = "structure_analysis"
-            job_data["progress"] = 40
-            self._update_job(job_id, job_data)
-            
-            structure_analysis = self._analyze_structure(ast_result)
-            job_data["results"]["structure"] = structure_analysis
-            
-            # Stage 3: Dependency Mapping
-            job_data["current_stage"] = "dependency_mapping"
-            job_data["progress"] = 60
-            self._update_job(job_id, job_data)
-            
-            dependencies = self._map_dependencies(ast_result)
-            job_data["results"]["dependencies"] = dependencies
-            
-            # Stage 4: Complexity Analysis
-            job_data["current_stage"] = "complexity_analysis"
-            job_data["progress"] = 80
-            self._update_job(job_id, job_data)
-            
-            complexity = self._analyze_complexity(ast_result, cobol_code)
-            job_data["results"]["complexity"] = complexity
-            
-            # Stage 5: Documentation Generation
-            job_data["current_stage"] = "documentation_generation"
-            job_data["progress"] = 90
-            self._update_job(job_id, job_data)
-            
-            documentation = self._generate_documentation(job_data["results"])
-            job_data["results"]["documentation"] = documentation
+            # Identical sources always produce identical results, so reuse them
+            cached_results = self._cached_results(cobol_code)
+            if cached_results is not None:
+                job_data["results"] = cached_results
+            else:
+                self._run_analysis_stages(job_id, job_data, cobol_code)
+                self._store_cached_results(cobol_code, job_data["results"])
             
             # Complete
             job_data["status"] = "completed"
@@ -109,7 +237,78 @@ class AdvancedLLMService:
             job_data["error"] = str(e)
             self._update_job(job_id, job_data)
     
-    def _analyze_structure(self, ast_result: Dict) -> Dict:
+    def _run_analysis_stages(self, job_id: str, job_data: dict, cobol_code: str):
+        """Run the parsing and analysis stages, storing results on the job"""
+        # Stage 1: Parsing
+        job_data["current_stage"] = "parsing"
+        job_data["progress"] = 20
+        self._update_job(job_id, job_data)
+        
+        from cobol_parser import parse_cobol_to_ast
+        ast_result = parse_cobol_to_ast(cobol_code)
+        job_data["results"]["ast"] = ast_result
+        
+        # Stage 2: Structure Analysis
+        job_data["current_stage"] = "structure_analysis"
+        job_data["progress"] = 40
+        self._update_job(job_id, job_data)
+        
+        structure_analysis = self._analyze_structure(ast_result)
+        job_data["results"]["structure"] = structure_analysis
+        
+        # Stage 3: Dependency Mapping
+        job_data["current_stage"] = "dependency_mapping"
+        job_data["progress"] = 60
+        self._update_job(job_id, job_data)
+        
+        dependencies = self._map_dependencies(ast_result)
+        job_data["results"]["dependencies"] = dependencies
+        
+        # Stage 4: Complexity Analysis
+        job_data["current_stage"] = "complexity_analysis"
+        job_data["progress"] = 80
+        self._update_job(job_id, job_data)
+        
+        complexity = self._analyze_complexity(ast_result, cobol_code)
+        job_data["results"]["complexity"] = complexity
+        
+        # Stage 5: Documentation Generation
+        job_data["current_stage"] = "documentation_generation"
+        job_data["progress"] = 90
+        self._update_job(job_id, job_data)
+        
+        documentation = self._generate_documentation(job_data["results"])
+        job_data["results"]["documentation"] = documentation
+    
+    def _cache_path(self, cobol_code: str) -> str:
+        """Return the results cache file for a COBOL source"""
+        digest = hashlib.blake2b(cobol_code.encode('utf-8'), digest_size=16).hexdigest()
+        return os.path.join(self.upload_folder, '_cache', f"{digest}.json")
+    
+    def _cached_results(self, cobol_code: str) -> dict | None:
+        """Load previously computed results for this exact source, if any"""
+        try:
+            with open(self._cache_path(cobol_code), 'rb') as f:
+                return load_json(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable results cache entry: {e}")
+            return None
+    
+    def _store_cached_results(self, cobol_code: str, results: dict):
+        """Atomically write analysis results to the results cache"""
+        cache_file = self._cache_path(cobol_code)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                f.write(dump_json(results, indent=True))
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            logging.warning(f"Failed to write results cache entry: {e}")
+    
+    def _analyze_structure(self, ast_result: dict) -> dict:
         """Analyze COBOL program structure"""
         return {
             "program_id": ast_result.get("program_id", "UNKNOWN"),
@@ -121,7 +320,7 @@ class AdvancedLLMService:
             "data_item_count": len(ast_result.get("working_storage", [])),
         }
     
-    def _map_dependencies(self, ast_result: Dict) -> Dict:
+    def _map_dependencies(self, ast_result: dict) -> dict:
         """Map program dependencies"""
         return {
             "internal_calls": ast_result.get("dependencies", []),
@@ -131,15 +330,22 @@ class AdvancedLLMService:
             "file_operations": []
         }
     
-    def _analyze_complexity(self, ast_result: Dict, source_code: str) -> Dict:
+    def _analyze_complexity(self, ast_result: dict, source_code: str) -> dict:
         """Analyze code complexity"""
-        lines = source_code.split('\n')
-        non_empty_lines = [line for line in lines if line.strip()]
+        total_lines = code_lines = comment_lines = 0
+        for line in source_code.split('\n'):
+            total_lines += 1
+            stripped = line.lstrip()
+            if not stripped:
+                continue
+            code_lines += 1
+            if stripped[0] == '*':
+                comment_lines += 1
         
         return {
-            "total_lines": len(lines),
-            "code_lines": len(non_empty_lines),
-            "comment_lines": len([line for line in lines if line.strip().startswith('*')]),
+            "total_lines": total_lines,
+            "code_lines": code_lines,
+            "comment_lines": comment_lines,
             "complexity_rating": ast_result.get("complexity", "Medium"),
             "cyclomatic_complexity": self._calculate_cyclomatic_complexity(source_code),
             "maintainability_score": self._calculate_maintainability_score(ast_result)
@@ -147,17 +353,10 @@ class AdvancedLLMService:
     
     def _calculate_cyclomatic_complexity(self, source_code: str) -> int:
         """Calculate cyclomatic complexity"""
-        decision_points = 0
-        lines = source_code.upper().split('\n')
-        
-        for line in lines:
-            line = line.strip()
-            if any(keyword in line for keyword in ['IF', 'PERFORM', 'EVALUATE', 'WHEN']):
-                decision_points += 1
-        
+        decision_points = len(_DECISION_KEYWORD_RE.findall(source_code))
         return decision_points + 1  # Base complexity
     
-    def _calculate_maintainability_score(self, ast_result: Dict) -> int:
+    def _calculate_maintainability_score(self, ast_result: dict) -> int:
         """Calculate maintainability score (0-100)"""
         score = 100
         
@@ -177,7 +376,7 @@ class AdvancedLLMService:
         
         return max(0, score)
     
-    def _generate_documentation(self, analysis_results: Dict) -> Dict:
+    def _generate_documentation(self, analysis_results: dict) -> dict:
         """Generate comprehensive documentation"""
         documentation = {
             "generated_at": datetime.now().isoformat(),
@@ -190,21 +389,20 @@ class AdvancedLLMService:
         
         return documentation
     
-    def _generate_summary(self, results: Dict) -> str:
+    def _generate_summary(self, results: dict) -> str:
         """Generate program summary"""
         structure = results.get("structure", {})
         complexity = results.get("complexity", {})
         
-        return f"""
-Program Overview:
-- Program ID: {structure.get('program_id', 'Unknown')}
-- Total Lines: {complexity.get('total_lines', 0)}
-- Procedures: {structure.get('paragraph_count', 0)}
-- Complexity: {complexity.get('complexity_rating', 'Unknown')}
-- Maintainability Score: {complexity.get('maintainability_score', 0)}/100
-        """.strip()
+        return _SUMMARY_TEMPLATE.format_map({
+            "program_id": structure.get('program_id', 'Unknown'),
+            "total_lines": complexity.get('total_lines', 0),
+            "paragraph_count": structure.get('paragraph_count', 0),
+            "complexity_rating": complexity.get('complexity_rating', 'Unknown'),
+            "maintainability_score": complexity.get('maintainability_score', 0),
+        })
     
-    def _generate_structure_overview(self, results: Dict) -> Dict:
+    def _generate_structure_overview(self, results: dict) -> dict:
         """Generate structure overview"""
         structure = results.get("structure", {})
         return {
@@ -214,7 +412,7 @@ Program Overview:
             "file_definitions": len(structure.get("file_definitions", []))
         }
     
-    def _generate_complexity_report(self, results: Dict) -> Dict:
+    def _generate_complexity_report(self, results: dict) -> dict:
         """Generate complexity analysis report"""
         complexity = results.get("complexity", {})
         return {
@@ -228,7 +426,7 @@ Program Overview:
             }
         }
     
-    def _generate_dependency_report(self, results: Dict) -> Dict:
+    def _generate_dependency_report(self, results: dict) -> dict:
         """Generate dependency analysis report"""
         dependencies = results.get("dependencies", {})
         return {
@@ -238,7 +436,7 @@ Program Overview:
             "total_dependencies": len(dependencies.get("internal_calls", []) + dependencies.get("copybooks", []))
         }
     
-    def _generate_recommendations(self, results: Dict) -> List[str]:
+    def _generate_recommendations(self, results: dict) -> list[str]:
         """Generate improvement recommendations"""
         recommendations = []
         complexity = results.get("complexity", {})
@@ -263,42 +461,188 @@ Program Overview:
         
         return recommendations
     
-    def _update_job(self, job_id: str, job_data: Dict):
-        """Update job data in storage"""
-        self.jobs[job_id] = job_data
-        job_file = os.path.join(self.upload_folder, f"{job_id}.json")
-        with open(job_file, 'w') as f:
-            json.dump(job_data, f, indent=2)
+    def _put_job(self, job_id: str, job_data: dict):
+        """Store a job in memory, evicting the least recently used beyond the limit"""
+        with self._jobs_lock:
+            self.jobs[job_id] = job_data
+            self.jobs.move_to_end(job_id)
+            while len(self.jobs) > self._jobs_max:
+                self.jobs.popitem(last=False)
     
-    def get_job_status(self, job_id: str) -> Optional[Dict]:
-        """Get job status and results"""
-        if job_id in self.jobs:
-            return self.jobs[job_id]
+    def _get_job(self, job_id: str) -> dict | None:
+        """Return an in-memory job, marking it as recently used"""
+        with self._jobs_lock:
+            job_data = self.jobs.get(job_id)
+            if job_data is not None:
+                self.jobs.move_to_end(job_id)
+            return job_data
+    
+    def _update_job(self, job_id: str, job_data: dict):
+        """Update job data in memory and schedule a background flush to storage"""
+        self._put_job(job_id, job_data)
         
-        # Try loading from file
+        # Stages replace entries in "results" rather than mutating them, so a
+        # copy of the two top-level dicts is a consistent snapshot to serialize.
+        snapshot = dict(job_data, results=dict(job_data.get("results", {})))
+        with self._lock:
+            self._status_cache.pop(job_id, None)
+            self._pending[job_id] = snapshot
+            if self._flush_future is None:
+                self._flush_future = self._io_pool.submit(self._flush_pending)
+    
+    def _flush_pending(self):
+        """Write pending job snapshots in batches until none are left"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._flush_future = None
+                    return
+                batch = [
+                    (job_id, self._pending.pop(job_id))
+                    for job_id in list(self._pending)[:_FLUSH_BATCH_SIZE]
+                ]
+            
+            written = []
+            for job_id, job_data in batch:
+                try:
+                    self._write_job_file(job_id, job_data)
+                    written.append(job_data)
+                except Exception as e:
+                    logging.error(f"Failed to write job file for {job_id}: {e}")
+            try:
+                self._index_jobs(written)
+            except Exception as e:
+                logging.error(f"Failed to update job index: {e}")
+    
+    def _wait_for_flush(self):
+        """Block until every pending job update has been written"""
+        while True:
+            with self._lock:
+                future = self._flush_future
+            if future is None:
+                return
+            future.result()
+    
+    def _write_job_file(self, job_id: str, job_data: dict):
+        """Atomically replace the job file on disk"""
         job_file = os.path.join(self.upload_folder, f"{job_id}.json")
-        if os.path.exists(job_file):
-            with open(job_file, 'r') as f:
-                job_data = json.load(f)
-                self.jobs[job_id] = job_data
-                return job_data
-        
-        return None
+        tmp_file = f"{job_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(dump_json(job_data, indent=True))
+        os.replace(tmp_file, job_file)
+    
+    def _index_connection(self) -> sqlite3.Connection:
+        """Open a connection to the job index, creating it on first use"""
+        with self._index_lock:
+            if self._index_ready:
+                return sqlite3.connect(self._index_path, timeout=10)
+            
+            os.makedirs(self.upload_folder, exist_ok=True)
+            is_new = not os.path.exists(self._index_path)
+            conn = sqlite3.connect(self._index_path, timeout=10)
+            with conn:
+                conn.executescript(_JOB_INDEX_SCHEMA)
+            if is_new:
+                self._backfill_index(conn)
+            self._index_ready = True
+            return conn
     
-    def list_jobs(self, user_id: str = None) -> List[Dict]:
-        """List all jobs for a user"""
+    def _backfill_index(self, conn: sqlite3.Connection):
+        """Index job files written before the index existed"""
         jobs = []
         for filename in os.listdir(self.upload_folder):
             if filename.endswith('.json') and not filename.startswith('_'):
                 try:
-                    with open(os.path.join(self.upload_folder, filename), 'r') as f:
-                        job_data = json.load(f)
-                        if user_id is None or job_data.get('user_id') == user_id:
-                            jobs.append(job_data)
+                    with open(os.path.join(self.upload_folder, filename), 'rb') as f:
+                        job_data = load_json(f.read())
+                    # Only <job_id>.json is a job file; documents such as
+                    # <job_id>_coco_documentation.json also carry a job_id
+                    if isinstance(job_data, dict) and job_data.get('job_id') == filename[:-len('.json')]:
+                        jobs.append(job_data)
                 except Exception as e:
                     logging.error(f"Error loading job file {filename}: {e}")
+        with conn:
+            conn.executemany(_JOB_INDEX_UPSERT, [_index_row(job) for job in jobs])
+    
+    def save_job(self, job_data: dict):
+        """Write and index a job that runs outside the job pool"""
+        self._write_job_file(job_data["job_id"], job_data)
+        self._index_jobs([job_data])
+    
+    def _index_jobs(self, jobs):
+        """Insert or refresh job rows in the job index"""
+        conn = self._index_connection()
+        try:
+            with conn:
+                conn.executemany(_JOB_INDEX_UPSERT, [_index_row(job) for job in jobs])
+        finally:
+            conn.close()
+    
+    def get_job_status(self, job_id: str) -> dict | None:
+        """Get job status and results"""
+        job_data = self._get_job(job_id)
+        if job_data is not None and job_data.get("status") in _TERMINAL_STATUSES:
+            return job_data
+        
+        cached = self._get_cached_status(job_id)
+        if cached is not None:
+            return cached
+        
+        # Running jobs are updated by a pool worker, so the file is authoritative
+        job_file = os.path.join(self.upload_folder, f"{job_id}.json")
+        if os.path.exists(job_file):
+            with open(job_file, 'rb') as f:
+                job_data = load_json(f.read())
+                self._put_job(job_id, job_data)
+                self._cache_status(job_id, job_data)
+                return job_data
+        
+        return job_data
+    
+    def _get_cached_status(self, job_id: str) -> dict | None:
+        """Return a recently read job document if it has not expired"""
+        with self._lock:
+            entry = self._status_cache.get(job_id)
+            if entry is None:
+                return None
+            expires_at, job_data = entry
+            if expires_at < time.monotonic():
+                del self._status_cache[job_id]
+                return None
+            return job_data
+    
+    def _cache_status(self, job_id: str, job_data: dict):
+        """Remember a job document read from disk"""
+        if job_data.get("status") == "completed":
+            ttl = _COMPLETED_STATUS_CACHE_TTL
+        else:
+            ttl = _STATUS_CACHE_TTL
+        with self._lock:
+            self._status_cache.pop(job_id, None)
+            if len(self._status_cache) >= _STATUS_CACHE_MAX:
+                # Entries are kept in insertion order, so this drops the oldest
+                del self._status_cache[next(iter(self._status_cache))]
+            self._status_cache[job_id] = (time.monotonic() + ttl, job_data)
+    
+    def list_jobs(self, user_id: str | None = None) -> list[dict]:
+        """List all jobs for a user, newest first
+        
+        Returns index rows only; use get_job_status for a job's full payload.
+        """
+        query = f"SELECT {', '.join(_JOB_INDEX_COLUMNS)} FROM jobs"
+        params = ()
+        if user_id is not None:
+            query += " WHERE user_id = ?"
+            params = (user_id,)
+        query += " ORDER BY created_at DESC"
+        
+        conn = self._index_connection()
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
         
-        return sorted(jobs, key=lambda x: x.get('created_at', 0), reverse=True)
+        return [dict(zip(_JOB_INDEX_COLUMNS, row)) for row in rows]
 
 # Global instance
 advanced_llm_service = AdvancedLLMService()
\ No newline at end of file
@@ -1,100 +1,240 @@
 """
 Analytics service for COBOL analysis platform
 """
+import time
 import logging
+import threading
+from datetime import datetime
 from typing import Dict, Any, List
 from collections import Counter
 
-def generate_codebase_overview():
-    """Generate comprehensive codebase overview"""
+# Dashboards poll the report every few seconds; polls within this window
+# share one table scan. Program inserts/updates/deletes invalidate it early.
+REPORT_CACHE_TTL = 5.0
+
+_report_cache = {'report': None, 'expires_at': 0.0}
+_report_lock = threading.Lock()
+_invalidation_hooks_installed = False
+
+def _scan_programs():
+    """Scan the programs table once, collecting overview counters and relationships"""
     from models import CobolProgram
     from app import db
     
-    try:
-        programs = CobolProgram.query.all()
-        
-        if not programs:
-            return {
-                'total_programs': 0,
-                'total_lines': 0,
-                'complexity_breakdown': {'Low': 0, 'Medium': 0, 'High': 0},
-                'most_common_dependencies': [],
-                'status': 'empty'
-            }
-        
-        total_lines = sum(p.line_count or 0 for p in programs)
-        complexity_counts = Counter(p.complexity for p in programs if p.complexity)
-        
-        # Get most common dependencies
-        all_deps = []
-        for p in programs:
-            if p.dependencies:
-                if isinstance(p.dependencies, list):
-                    all_deps.extend(p.dependencies)
-                elif isinstance(p.dependencies, str):
-                    all_deps.append(p.dependencies)
-        
-        common_deps = Counter(all_deps).most_common(5)
+    rows = db.session.query(
+        CobolProgram.program_id,
+        CobolProgram.line_count,
+        CobolProgram.complexity,
+        CobolProgram.dependencies
+    ).yield_per(500)
+    
+    total_programs = 0
+    total_lines = 0
+    complexity_counts = Counter()
+    dependency_counts = Counter()
+    relationships = []
+    for program_id, line_count, complexity, dependencies in rows:
+        total_programs += 1
+        total_lines += line_count or 0
+        if complexity:
+            complexity_counts[complexity] += 1
         
-        return {
-            'total_programs': len(programs),
-            'total_lines': total_lines,
-            'complexity_breakdown': {
-                'Low': complexity_counts.get('Low', 0),
-                'Medium': complexity_counts.get('Medium', 0),
-                'High': complexity_counts.get('High', 0)
-            },
-            'most_common_dependencies': [{'name': dep, 'count': count} for dep, count in common_deps],
-            'status': 'success'
-        }
-    except Exception as e:
-        logging.error(f"Analytics error: {e}")
+        # Dependencies are always stored as a list (see CobolProgram.validate_dependencies)
+        if dependencies:
+            dependency_counts.update(dependencies)
+            for dep in dependencies:
+                relationships.append({
+                    'source': program_id,
+                    'target': dep,
+                    'type': 'CALL'
+                })
+    
+    return {
+        'total_programs': total_programs,
+        'total_lines': total_lines,
+        'complexity_counts': complexity_counts,
+        'dependency_counts': dependency_counts,
+        'relationships': relationships
+    }
+
+def _build_overview(scan):
+    """Shape a program scan into the codebase overview response"""
+    if not scan['total_programs']:
         return {
             'total_programs': 0,
             'total_lines': 0,
             'complexity_breakdown': {'Low': 0, 'Medium': 0, 'High': 0},
             'most_common_dependencies': [],
-            'status': 'error',
-            'error': str(e)
+            'status': 'empty'
         }
+    
+    complexity_counts = scan['complexity_counts']
+    common_deps = scan['dependency_counts'].most_common(5)
+    
+    return {
+        'total_programs': scan['total_programs'],
+        'total_lines': scan['total_lines'],
+        'complexity_breakdown': {
+            'Low': complexity_counts.get('Low', 0),
+            'Medium': complexity_counts.get('Medium', 0),
+            'High': complexity_counts.get('High', 0)
+        },
+        'most_common_dependencies': [{'name': dep, 'count': count} for dep, count in common_deps],
+        'status': 'success'
+    }
 
-def analyze_program_relationships():
-    """Analyze relationships between programs"""
-    from models import CobolProgram
+def _overview_error(e):
+    """Codebase overview response for a failed scan"""
+    logging.error(f"Analytics error: {e}")
+    return {
+        'total_programs': 0,
+        'total_lines': 0,
+        'complexity_breakdown': {'Low': 0, 'Medium': 0, 'High': 0},
+        'most_common_dependencies': [],
+        'status': 'error',
+        'error': str(e)
+    }
+
+def _build_relationships(scan):
+    """Shape a program scan into the relationships response"""
+    relationships = scan['relationships']
+    return {
+        'relationships': relationships,
+        'total_relationships': len(relationships),
+        'status': 'success'
+    }
+
+def _relationships_error(e):
+    """Relationships response for a failed scan"""
+    logging.error(f"Relationship analysis error: {e}")
+    return {
+        'relationships': [],
+        'total_relationships': 0,
+        'status': 'error',
+        'error': str(e)
+    }
+
+def _overview_from_stats():
+    """Read the precomputed overview row, or None if it is missing or stale"""
+    from models import SystemStats
+    
+    # populate_existing: the stale flag is set with a Core UPDATE, which does not
+    # refresh a row already loaded into this session
+    stats = SystemStats.query.execution_options(populate_existing=True).first()
+    if stats is None or stats.last_updated is None or stats.common_dependencies is None:
+        return None
+    
+    complexity_counts = stats.complexity_breakdown or {}
+    return {
+        'total_programs': stats.total_programs or 0,
+        'total_lines': stats.total_lines_of_code or 0,
+        'complexity_breakdown': {
+            'Low': complexity_counts.get('Low', 0),
+            'Medium': complexity_counts.get('Medium', 0),
+            'High': complexity_counts.get('High', 0)
+        },
+        'most_common_dependencies': stats.common_dependencies,
+        'status': 'success' if stats.total_programs else 'empty'
+    }
+
+def _store_overview_stats(scan, overview):
+    """Persist a freshly computed overview as the precomputed row"""
+    from models import SystemStats
     from app import db
     
     try:
-        programs = CobolProgram.query.all()
-        
-        relationships = []
-        for program in programs:
-            if program.dependencies:
-                deps = program.dependencies if isinstance(program.dependencies, list) else [program.dependencies]
-                for dep in deps:
-                    relationships.append({
-                        'source': program.program_id,
-                        'target': dep,
-                        'type': 'CALL'
-                    })
-        
-        return {
-            'relationships': relationships,
-            'total_relationships': len(relationships),
-            'status': 'success'
-        }
+        stats = SystemStats.query.first()
+        if not stats:
+            stats = SystemStats()
+            db.session.add(stats)
+        stats.total_programs = scan['total_programs']
+        stats.total_lines_of_code = scan['total_lines']
+        stats.complexity_breakdown = dict(scan['complexity_counts'])
+        stats.dependency_count = sum(scan['dependency_counts'].values())
+        stats.common_dependencies = overview['most_common_dependencies']
+        stats.last_updated = datetime.utcnow()
+        db.session.commit()
     except Exception as e:
-        logging.error(f"Relationship analysis error: {e}")
-        return {
-            'relationships': [],
-            'total_relationships': 0,
-            'status': 'error',
-            'error': str(e)
-        }
+        logging.warning(f"Could not store precomputed statistics: {e}")
+        db.session.rollback()
+
+def generate_codebase_overview():
+    """Generate comprehensive codebase overview
+    
+    Served from the precomputed SystemStats row; program writes mark it
+    stale (see models.mark_system_stats_stale) and the next call rebuilds it.
+    """
+    from app import db
+    
+    try:
+        overview = _overview_from_stats()
+        if overview is not None:
+            return overview
+    except Exception as e:
+        logging.warning(f"Precomputed statistics unavailable: {e}")
+        # A failed statement aborts the transaction on PostgreSQL; clear it
+        # before the fallback scan runs in the same session
+        db.session.rollback()
+    
+    try:
+        scan = _scan_programs()
+        overview = _build_overview(scan)
+    except Exception as e:
+        return _overview_error(e)
+    
+    _store_overview_stats(scan, overview)
+    return overview
+
+def analyze_program_relationships():
+    """Analyze relationships between programs"""
+    try:
+        return _build_relationships(_scan_programs())
+    except Exception as e:
+        return _relationships_error(e)
+
+def invalidate_analytics_cache():
+    """Drop the cached analytics report"""
+    _report_cache['report'] = None
+
+def _on_program_change(mapper, connection, target):
+    """SQLAlchemy mapper event: a program row changed"""
+    invalidate_analytics_cache()
+
+def _install_invalidation_hooks():
+    """Invalidate the cached report whenever a program is written"""
+    global _invalidation_hooks_installed
+    if _invalidation_hooks_installed:
+        return
+    from models import CobolProgram
+    from sqlalchemy import event
+    for event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(CobolProgram, event_name, _on_program_change)
+    _invalidation_hooks_installed = True
 
 def generate_analytics_report():
-    """Generate comprehensive analytics report"""
-    overview = generate_codebase_overview()
-    relationships = analyze_program_relationships()
+    """Generate comprehensive analytics report, cached for REPORT_CACHE_TTL seconds"""
+    with _report_lock:
+        _install_invalidation_hooks()
+        report = _report_cache['report']
+        if report is not None and _report_cache['expires_at'] > time.monotonic():
+            return report
+        
+        report = _build_analytics_report()
+        if report['status'] == 'success':
+            _report_cache['report'] = report
+            _report_cache['expires_at'] = time.monotonic() + REPORT_CACHE_TTL
+        return report
+
+def _build_analytics_report():
+    """Scan the programs table and assemble the analytics report"""
+    # Both sections come from the same rows, so scan the table only once
+    try:
+        scan = _scan_programs()
+        overview = _build_overview(scan)
+        relationships = _build_relationships(scan)
+    except Exception as e:
+        overview = _overview_error(e)
+        relationships = _relationships_error(e)
     
     return {
         'overview': overview,
@@ -1,5 +1,6 @@
 import os
 import logging
+import threading
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
@@ -11,7 +12,69 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
+# Analytics code only reads after committing, so keep loaded attributes
+# instead of refetching every object on its next access
+db = SQLAlchemy(model_class=Base, session_options={"expire_on_commit": False})
+
+# External services are initialized in the background so startup never
+# blocks on them; handlers that need one wait via external_service_ready().
+_external_ready = threading.Event()
+_external_services = {"weaviate": False, "cognee": False}
+_bootstrap_pid = None
+
+def start_external_bootstrap(app):
+    """Start initializing external services in the background, once per process
+    
+    Threads do not survive fork, so with preload_app gunicorn's post_fork
+    calls this again in each worker.
+    """
+    global _bootstrap_pid
+    if _bootstrap_pid == os.getpid():
+        return
+    _bootstrap_pid = os.getpid()
+    _external_ready.clear()
+    for name in _external_services:
+        _external_services[name] = False
+    threading.Thread(target=_bootstrap_external, args=(app,), name="external-bootstrap", daemon=True).start()
+
+def _bootstrap_external(app):
+    """Initialize Weaviate and Cognee off the startup path"""
+    try:
+        with app.app_context():
+            _init_external_services()
+    finally:
+        _external_ready.set()
+
+def _init_external_services():
+    """Initialize each external service, recording which ones came up"""
+    try:
+        from database_setup import setup_weaviate_schema
+        if setup_weaviate_schema():
+            _external_services["weaviate"] = True
+            logging.info("Weaviate schema initialized successfully")
+        else:
+            logging.warning("Failed to initialize Weaviate schema - vector search may not work")
+    except ImportError as e:
+        logging.warning(f"Weaviate setup not available: {str(e)}")
+    except Exception as e:
+        logging.warning(f"Weaviate initialization failed: {str(e)}")
+    
+    try:
+        from knowledge import initialize_cognee
+        if initialize_cognee():
+            _external_services["cognee"] = True
+            logging.info("Cognee.ai initialized successfully")
+        else:
+            logging.warning("Failed to initialize Cognee.ai - knowledge graph features may not work")
+    except ImportError as e:
+        logging.warning(f"Cognee setup not available: {str(e)}")
+    except Exception as e:
+        logging.warning(f"Cognee initialization failed: {str(e)}")
+
+def external_service_ready(name, timeout=5.0):
+    """Wait up to timeout seconds for bootstrap and report whether a service is usable"""
+    _external_ready.wait(timeout)
+    return _external_services.get(name, False)
 
 def create_app():
     """Application factory pattern"""
@@ -30,6 +93,12 @@ def create_app():
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "pool_recycle": 300,
         "pool_pre_ping": True,
+        # Per process; gunicorn_conf.py sets both from the worker count so
+        # all workers together stay within the database's max_connections
+        "pool_size": int(os.environ.get("SQLALCHEMY_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("SQLALCHEMY_MAX_OVERFLOW", 10)),
+        # Reuse the most recently returned connection so its server-side caches stay warm
+        "pool_use_lifo": True,
     }
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     
@@ -60,33 +129,16 @@ def create_app():
             db.create_all()
             logging.info("Database tables created successfully")
             
-            # Initialize database connections with error handling
-            try:
-                from database_setup import setup_weaviate_schema
-                if setup_weaviate_schema():
-                    logging.info("Weaviate schema initialized successfully")
-                else:
-                    logging.warning("Failed to initialize Weaviate schema - vector search may not work")
-            except ImportError as e:
-                logging.warning(f"Weaviate setup not available: {str(e)}")
-            except Exception as e:
-                logging.warning(f"Weaviate initialization failed: {str(e)}")
-            
-            # Initialize Cognee with error handling
-            try:
-                from knowledge import initialize_cognee
-                if initialize_cognee():
-                    logging.info("Cognee.ai initialized successfully")
-                else:
-                    logging.warning("Failed to initialize Cognee.ai - knowledge graph features may not work")
-            except ImportError as e:
-                logging.warning(f"Cognee setup not available: {str(e)}")
-            except Exception as e:
-                logging.warning(f"Cognee initialization failed: {str(e)}")
-                
+            # create_all() leaves existing tables as they are
+            from database_setup import add_missing_columns, normalize_program_dependencies
+            add_missing_columns()
+            # Rows stored before dependencies were normalized on write
+            normalize_program_dependencies()
         except Exception as e:
             logging.error(f"Database initialization error: {str(e)}")
     
+    start_external_bootstrap(app)
+    
     # Register routes
     from routes import register_routes
     register_routes(app)
@@ -97,4 +149,5 @@ def create_app():
 app = create_app()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn (gunicorn_conf.py)
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_ENV', 'development') == 'development')
@@ -4,12 +4,70 @@ Integrated from COBOL-to-JSON converter capabilities
 Handles COBOL data file conversion to/from JSON format
 """
 import os
-import json
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional, Union
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice, repeat
+from typing import Dict, Any, Iterator, List, Optional, Union
 from datetime import datetime
 import subprocess
-import tempfile
+
+from cobol_parser import parse_cobol_to_ast
+from json_codec import dump_json, load_json
+from process_pool import get_process_pool, pool_size
+
+# Parsed copybooks keyed by a digest of their source, most recently used last.
+# The same copybook is typically reused for every data file of a dataset.
+_COPYBOOK_CACHE_MAX = 64
+_copybook_cache = OrderedDict()
+_copybook_cache_lock = threading.Lock()
+
+def _parse_copybook(copybook_content: str) -> Dict[str, Any]:
+    """Parse a copybook, reusing the AST of an identical copybook (treat it as read-only)"""
+    digest = hashlib.blake2b(copybook_content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    with _copybook_cache_lock:
+        ast_result = _copybook_cache.get(digest)
+        if ast_result is not None:
+            _copybook_cache.move_to_end(digest)
+            return ast_result
+    
+    ast_result = parse_cobol_to_ast(copybook_content)
+    with _copybook_cache_lock:
+        _copybook_cache[digest] = ast_result
+        if len(_copybook_cache) > _COPYBOOK_CACHE_MAX:
+            _copybook_cache.popitem(last=False)
+    return ast_result
+
+def _file_size(path: str) -> int:
+    """Size of a file for error reports, 0 if it cannot be stat'ed (one stat call)"""
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+# convert_many converts smaller batches in-process; below this, handing
+# files to the process pool costs more than it saves
+_MIN_PARALLEL_FILES = 4
+
+# JSON records are formatted back to COBOL this many at a time
+_RECORD_BATCH_SIZE = 1024
+
+# Field names repeat across every record and file of a dataset, so each
+# (name, tag format) pair is formatted once
+@lru_cache(maxsize=4096)
+def _format_field_name(name: str, tag_format: str) -> str:
+    """Format field names according to specified format"""
+    if tag_format == 'UNDERSCORE':
+        # str.replace has a single-character fast path; a str.translate table
+        # is roughly 15x slower for this one substitution
+        return name.replace('-', '_')
+    elif tag_format == 'CAMEL_CASE':
+        parts = name.lower().split('-')
+        return parts[0] + ''.join(word.capitalize() for word in parts[1:])
+    else:  # ASIS
+        return name
 
 class COBOLDataConverter:
     """Enhanced COBOL data file converter with multiple format support"""
@@ -46,9 +104,6 @@ class COBOLDataConverter:
         'iso-8859-1': 'Latin-1'
     }
     
-    def __init__(self):
-        self.temp_dir = tempfile.mkdtemp(prefix='cobol_converter_')
-        
     def convert_cobol_to_json(self, 
                             cobol_data_file: str,
                             copybook_content: str,
@@ -68,6 +123,61 @@ class COBOLDataConverter:
         Returns:
             Dictionary containing conversion results
         """
+        return self._convert_cobol_to_json(
+            cobol_data_file, copybook_content, None, copybook_name, output_file, options
+        )
+    
+    def convert_many(self,
+                     data_files: List[str],
+                     copybook_content: str,
+                     copybook_name: str = "copybook.cbl",
+                     options: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Convert several COBOL data files that share one copybook to JSON
+        
+        The copybook is parsed once and the files are converted on the
+        shared process pool. Batches too small to repay the round trips are
+        converted in this process instead.
+        
+        Args:
+            data_files: Paths to COBOL data files
+            copybook_content: COBOL copybook content
+            copybook_name: Name for the copybook file
+            options: Conversion options, applied to every file
+        
+        Returns:
+            One convert_cobol_to_json result per data file, in order
+        """
+        try:
+            ast_result = _parse_copybook(copybook_content)
+        except Exception as e:
+            error = self._cobol_to_json_error(e)
+            return [dict(error) for _ in data_files]
+        
+        if len(data_files) < _MIN_PARALLEL_FILES:
+            return [
+                self._convert_cobol_to_json(data_file, copybook_content, ast_result, copybook_name, None, options)
+                for data_file in data_files
+            ]
+        
+        chunksize = max(1, len(data_files) // (4 * pool_size()))
+        return list(get_process_pool().map(
+            _convert_cobol_to_json_worker,
+            data_files,
+            repeat(ast_result),
+            repeat(copybook_name),
+            repeat(options),
+            chunksize=chunksize
+        ))
+    
+    def _convert_cobol_to_json(self,
+                               cobol_data_file: str,
+                               copybook_content: Optional[str],
+                               ast_result: Optional[Dict],
+                               copybook_name: str,
+                               output_file: Optional[str],
+                               options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Convert a COBOL data file to JSON, parsing the copybook unless ast_result is given"""
         try:
             # Default options
             default_options = {
@@ -84,22 +194,20 @@ class COBOLDataConverter:
             if options:
                 default_options.update(options)
             
-            # Create temporary copybook file
-            copybook_path = os.path.join(self.temp_dir, copybook_name)
-            with open(copybook_path, 'w') as f:
-                f.write(copybook_content)
+            if ast_result is None:
+                ast_result = _parse_copybook(copybook_content)
             
             # Perform conversion using internal logic
             result = self._convert_with_python_logic(
                 cobol_data_file, 
-                copybook_path, 
+                ast_result, 
                 default_options
             )
             
             # Save to output file if specified
             if output_file:
-                with open(output_file, 'w') as f:
-                    json.dump(result['json_data'], f, indent=2)
+                with open(output_file, 'wb') as f:
+                    f.write(dump_json(result['json_data'], indent=True))
                 result['output_file'] = output_file
             
             return {
@@ -114,13 +222,17 @@ class COBOLDataConverter:
             }
             
         except Exception as e:
-            logging.error(f"COBOL to JSON conversion failed: {str(e)}")
-            return {
-                'status': 'error',
-                'error': str(e),
-                'conversion_type': 'cobol_to_json',
-                'timestamp': datetime.now().isoformat()
-            }
+            return self._cobol_to_json_error(e)
+    
+    def _cobol_to_json_error(self, e: Exception) -> Dict[str, Any]:
+        """Log a failed COBOL to JSON conversion and build its result"""
+        logging.error(f"COBOL to JSON conversion failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e),
+            'conversion_type': 'cobol_to_json',
+            'timestamp': datetime.now().isoformat()
+        }
     
     def convert_json_to_cobol(self,
                             json_file: str,
@@ -152,8 +264,8 @@ class COBOLDataConverter:
                 default_options.update(options)
             
             # Load JSON data
-            with open(json_file, 'r') as f:
-                json_data = json.load(f)
+            with open(json_file, 'rb') as f:
+                json_data = load_json(f.read())
             
             # Perform reverse conversion
             result = self._convert_json_to_cobol_internal(
@@ -185,19 +297,11 @@ class COBOLDataConverter:
     
     def _convert_with_python_logic(self, 
                                  data_file: str, 
-                                 copybook_path: str, 
+                                 ast_result: Dict, 
                                  options: Dict) -> Dict[str, Any]:
         """
-        Internal conversion logic using Python-based COBOL parsing
+        Internal conversion logic using the parsed copybook structure
         """
-        # Parse the copybook to understand structure
-        from cobol_parser import parse_cobol_to_ast
-        
-        with open(copybook_path, 'r') as f:
-            copybook_content = f.read()
-        
-        ast_result = parse_cobol_to_ast(copybook_content)
-        
         # Read COBOL data file
         json_records = []
         metadata = {
@@ -262,19 +366,12 @@ class COBOLDataConverter:
             elif options['font'] in self.SUPPORTED_FONTS:
                 encoding = options['font']
             
+            # The sample record describes the file by size and encoding only, so
+            # its contents are not decoded; opening it still reports an unreadable
+            # file. Decoding multi-gigabyte files just to discard the text was the
+            # dominant cost of this method.
             with open(data_file, 'rb') as f:
-                content = f.read()
-            
-            # Try to decode with specified encoding
-            try:
-                if encoding == 'cp037':
-                    # Handle EBCDIC conversion
-                    decoded_content = content.decode('cp037', errors='replace')
-                else:
-                    decoded_content = content.decode(encoding, errors='replace')
-            except:
-                # Fallback to UTF-8 with error handling
-                decoded_content = content.decode('utf-8', errors='replace')
+                data_length = os.fstat(f.fileno()).st_size
             
             # Create sample record based on copybook structure
             working_storage = ast_result.get('working_storage', [])
@@ -283,7 +380,7 @@ class COBOLDataConverter:
             sample_record = {
                 'record_type': 'FIXED_WIDTH_DATA',
                 'program_id': ast_result.get('program_id', 'UNKNOWN'),
-                'data_length': len(content),
+                'data_length': data_length,
                 'encoding_used': encoding,
                 'fields': {}
             }
@@ -303,7 +400,7 @@ class COBOLDataConverter:
             logging.error(f"Error processing fixed-width file: {str(e)}")
             records.append({
                 'error': f'Fixed-width processing failed: {str(e)}',
-                'file_size': os.path.getsize(data_file) if os.path.exists(data_file) else 0
+                'file_size': _file_size(data_file)
             })
         
         return records
@@ -311,21 +408,26 @@ class COBOLDataConverter:
     def _process_text_file(self, 
                          data_file: str, 
                          ast_result: Dict, 
-                         options: Dict) -> List[Dict]:
-        """Process text-based COBOL data file"""
+                         options: Dict,
+                         max_records: int = 10) -> List[Dict]:
+        """Process the first max_records lines of a text-based COBOL data file"""
         records = []
         
         try:
+            # Only the lines that are processed are read from the file
             with open(data_file, 'r', encoding='utf-8', errors='replace') as f:
-                lines = f.readlines()
+                lines = list(islice(f, max_records))
+            
+            # Field names and lengths come from the copybook, so resolve them once per file
+            layout = self._text_field_layout(ast_result, options)
             
-            for i, line in enumerate(lines[:10]):  # Process first 10 lines
+            for i, line in enumerate(lines):
                 record = {
                     'line_number': i + 1,
                     'program_id': ast_result.get('program_id', 'UNKNOWN'),
                     'raw_data': line.strip(),
                     'length': len(line.strip()),
-                    'fields': self._parse_text_line(line, ast_result, options)
+                    'fields': self._parse_text_line(line, layout, options)
                 }
                 records.append(record)
                 
@@ -346,7 +448,7 @@ class COBOLDataConverter:
         return [{
             'program_id': ast_result.get('program_id', 'UNKNOWN'),
             'file_path': data_file,
-            'file_size': os.path.getsize(data_file) if os.path.exists(data_file) else 0,
+            'file_size': _file_size(data_file),
             'processing_method': 'basic',
             'copybook_info': {
                 'procedures': len(ast_result.get('procedures', [])),
@@ -355,18 +457,28 @@ class COBOLDataConverter:
             }
         }]
     
-    def _parse_text_line(self, line: str, ast_result: Dict, options: Dict) -> Dict:
+    def _text_field_layout(self, ast_result: Dict, options: Dict) -> List[tuple]:
+        """Resolve the (formatted name, length) of each text-line field from the copybook"""
+        layout = []
+        for field in ast_result.get('working_storage', [])[:5]:  # Limit to first 5 fields
+            name = field.get('name')
+            formatted_name = self._format_field_name(name, options['tag_format']) if name is not None else None
+            layout.append((formatted_name, field.get('length', 10)))
+        return layout
+    
+    def _parse_text_line(self, line: str, layout: List[tuple], options: Dict) -> Dict:
         """Parse a text line based on copybook structure"""
         fields = {}
-        working_storage = ast_result.get('working_storage', [])
+        line_length = len(line)
         
         # Simple field extraction based on positions
         pos = 0
-        for field in working_storage[:5]:  # Limit to first 5 fields
-            field_name = self._format_field_name(field.get('name', f'FIELD_{pos}'), options['tag_format'])
-            field_length = field.get('length', 10)
+        for field_name, field_length in layout:
+            if field_name is None:
+                # Unnamed fields are labelled by where they would start
+                field_name = self._format_field_name(f'FIELD_{pos}', options['tag_format'])
             
-            if pos + field_length <= len(line):
+            if pos + field_length <= line_length:
                 field_value = line[pos:pos + field_length].strip()
                 fields[field_name] = field_value
                 pos += field_length
@@ -377,23 +489,18 @@ class COBOLDataConverter:
     
     def _format_field_name(self, name: str, tag_format: str) -> str:
         """Format field names according to specified format"""
-        if tag_format == 'UNDERSCORE':
-            return name.replace('-', '_')
-        elif tag_format == 'CAMEL_CASE':
-            parts = name.lower().split('-')
-            return parts[0] + ''.join(word.capitalize() for word in parts[1:])
-        else:  # ASIS
-            return name
+        return _format_field_name(name, tag_format)
     
     def _generate_sample_value(self, field: Dict) -> str:
         """Generate sample value for a field based on its type"""
         field_type = field.get('type', 'X')
         field_length = field.get('length', 1)
         
+        # ljust with a fill character builds the padded sample in one allocation
         if field_type.startswith('9'):
-            return '123' + '0' * max(0, field_length - 3)
+            return '123'.ljust(field_length, '0')
         elif field_type == 'X':
-            return 'ABC' + 'X' * max(0, field_length - 3)
+            return 'ABC'.ljust(field_length, 'X')
         else:
             return 'SAMPLE'
     
@@ -405,8 +512,7 @@ class COBOLDataConverter:
         """Internal logic for JSON to COBOL conversion"""
         try:
             # Parse copybook for structure
-            from cobol_parser import parse_cobol_to_ast
-            ast_result = parse_cobol_to_ast(copybook_content)
+            ast_result = _parse_copybook(copybook_content)
             
             # Extract records from JSON
             records = []
@@ -420,14 +526,12 @@ class COBOLDataConverter:
                 records = json_data
             
             # Convert records back to COBOL format
-            cobol_lines = []
-            for record in records:
-                cobol_line = self._convert_record_to_cobol(record, ast_result, options)
-                cobol_lines.append(cobol_line)
+            layout = self._record_layout(ast_result, options)
+            template = self._record_template(layout)
             
-            # Write to output file
+            # Write to output file a batch at a time, never holding the whole output
             with open(output_file, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(cobol_lines))
+                f.writelines(self._iter_cobol_batches(records, layout, template))
             
             return {
                 'record_count': len(records),
@@ -441,26 +545,41 @@ class COBOLDataConverter:
             logging.error(f"JSON to COBOL internal conversion failed: {str(e)}")
             raise
     
-    def _convert_record_to_cobol(self, record: Dict, ast_result: Dict, options: Dict) -> str:
-        """Convert a JSON record back to COBOL format"""
+    def _record_layout(self, ast_result: Dict, options: Dict) -> List[tuple]:
+        """Resolve (formatted name, length) for each copybook field once per conversion"""
+        tag_format = options.get('tag_format', 'ASIS')
+        return [
+            (self._format_field_name(field.get('name', ''), tag_format), field.get('length'))
+            for field in ast_result.get('working_storage', [])
+        ]
+    
+    def _record_template(self, layout: List[tuple]) -> str:
+        """Build the format string that pads or truncates each field to its length"""
+        # '{:<N.N}' left-aligns to width N and cuts at precision N in a single
+        # formatting step, with no intermediate padded string to slice
+        return ''.join(
+            '{}' if field_length is None else f'{{:<{field_length}.{field_length}}}'
+            for _, field_length in layout
+        )
+    
+    def _iter_cobol_batches(self, records: List[Dict], layout: List[tuple], template: str) -> Iterator[str]:
+        """Yield the COBOL output for records batch by batch, newline-separated"""
+        for start in range(0, len(records), _RECORD_BATCH_SIZE):
+            if start:
+                yield '\n'
+            batch = records[start:start + _RECORD_BATCH_SIZE]
+            yield self._convert_records_to_cobol(batch, layout, template)
+    
+    def _convert_records_to_cobol(self, records: List[Dict], layout: List[tuple], template: str) -> str:
+        """Convert a batch of JSON records back to newline-separated COBOL records"""
         # This is a simplified conversion
         # In a full implementation, this would respect the exact COBOL field formats
         
-        cobol_parts = []
-        working_storage = ast_result.get('working_storage', [])
-        
-        for field in working_storage:
-            field_name = field.get('name', '')
-            formatted_name = self._format_field_name(field_name, options.get('tag_format', 'ASIS'))
-            
-            if formatted_name in record:
-                value = str(record[formatted_name])
-                field_length = field.get('length', len(value))
-                # Pad or truncate to field length
-                formatted_value = value.ljust(field_length)[:field_length]
-                cobol_parts.append(formatted_value)
-        
-        return ''.join(cobol_parts)
+        # Missing fields are blank-filled so the remaining fields keep their columns;
+        # a field without a known length is written as-is. The whole batch is
+        # formatted by one call so the output is built in a single allocation.
+        batch_template = '\n'.join([template] * len(records))
+        return batch_template.format(*[str(record.get(name, '')) for record in records for name, _ in layout])
     
     def get_conversion_options(self) -> Dict[str, Any]:
         """Get available conversion options"""
@@ -475,14 +594,16 @@ class COBOLDataConverter:
                 'HIGHEST': 'Split on highest repeating level'
             }
         }
-    
-    def cleanup(self):
-        """Clean up temporary files"""
-        import shutil
-        try:
-            shutil.rmtree(self.temp_dir)
-        except Exception as e:
-            logging.warning(f"Failed to cleanup temp directory: {str(e)}")
+
+# Converter instance owned by a pool worker process, built on first use
+_worker_converter = None
+
+def _convert_cobol_to_json_worker(data_file: str, ast_result: Dict, copybook_name: str, options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert one data file for convert_many inside a pool worker process"""
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = COBOLDataConverter()
+    return _worker_converter._convert_cobol_to_json(data_file, None, ast_result, copybook_name, None, options)
 
 # Global converter instance
 cobol_data_converter = COBOLDataConverter()
\ No newline at end of file
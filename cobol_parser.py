@@ -4,9 +4,67 @@ COBOL Parser for extracting program structure and creating AST
 
 import os
 import re
+import json
+import mmap
+import string
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
-from pathlib import Path
+from typing import Dict, Iterator, List, Any, Optional
+
+from process_pool import get_process_pool, pool_size
+
+# COBOL file extensions
+_COBOL_EXTENSIONS = frozenset({'.cob', '.cbl', '.cobol', '.cpy', '.txt'})
+
+# extract_cobol_files parses smaller directories in-process; below this,
+# handing files to the process pool costs more than it saves
+_MIN_PARALLEL_FILES = 16
+
+# Sources at least this large are decoded straight from a memory map; below
+# it, mapping costs more than the copy it saves
+_MMAP_MIN_SIZE = 256 * 1024
+
+# Files parsed by extract_cobol_files are cached on disk by path and reused
+# while their modification time and size are unchanged. Bump the version
+# whenever the parser's output changes.
+AST_CACHE_VERSION = 2
+
+# Patterns are compiled once here rather than looked up in re's cache per call.
+# They stay on the stdlib re engine: DFA multi-pattern engines (Hyperscan, RE2)
+# are not dependencies, and Hyperscan reports match offsets without capture
+# groups, so every CALL/COPY/PERFORM hit would need a second re pass for its name.
+#
+# Keyword patterns are uppercase-only and run against an uppercased copy of the
+# source (see _upper), which lets re skip per-character case folding and use its
+# literal prefix search. Names are sliced from the original source by offset.
+_PROGRAM_ID_RE = re.compile(r'PROGRAM-ID\.\s*([A-Z0-9\-]+)')
+_PROGRAM_ID_ALT_RE = re.compile(r'PROGRAM-ID\s+([A-Z0-9\-]+)')
+# One group per division, in the order divisions are reported (match.lastindex)
+_DIVISION_RE = re.compile(r'(?:(IDENTIFICATION)|(ENVIRONMENT)|(DATA)|(PROCEDURE))\s+DIVISION')
+_PARAGRAPH_RE = re.compile(r'^[A-Za-z][A-Za-z0-9\-]*\.$')
+_PERFORM_RE = re.compile(r'PERFORM\s+([A-Z][A-Z0-9\-]*)')
+_WORKING_STORAGE_RE = re.compile(
+    r'WORKING-STORAGE\s+SECTION\.(.*?)(?=\n\s*[A-Z\-]+\s+SECTION\.|\nPROCEDURE\s+DIVISION|$)',
+    re.DOTALL
+)
+_LEVEL_RE = re.compile(r'^(\d{2})\s+([A-Za-z][A-Za-z0-9\-]*)')
+_FILE_SECTION_RE = re.compile(
+    r'FILE\s+SECTION\.(.*?)(?=\n\s*[A-Z\-]+\s+SECTION\.|\nWORKING-STORAGE|$)',
+    re.DOTALL
+)
+_FD_RE = re.compile(r'FD\s+([A-Z][A-Z0-9\-]*)')
+# CALL 'PROGRAM' (group 1) or CALL identifier (group 2), in one pass. The
+# lookahead keeps matches from consuming text, so a CALL mentioned at the
+# end of a comment cannot swallow the real CALL on the next line
+_CALL_RE = re.compile(r'(?=CALL\s+(?:[\'"]([A-Z0-9\-]+)[\'"]|([A-Z][A-Z0-9\-]*)))')
+_COPY_RE = re.compile(r'COPY\s+([A-Z0-9\-]+)')
+# Complexity keywords; match.lastindex tells which one matched. The leading
+# lookahead changes nothing it matches, but gives re a first-character set to
+# skip ahead with, which a pattern opening with \b does not have
+_KEYWORD_WORD_RE = re.compile(r'(?=[ICP])\b(?:(IF)|(PERFORM)|(CALL))\b')
+
+# Maps ASCII lowercase letters only, so the text keeps its length
+_ASCII_UPPER = str.maketrans(string.ascii_lowercase, string.ascii_uppercase)
 
 def extract_cobol_files(directory_path: str) -> List[Dict[str, Any]]:
     """
@@ -21,23 +79,18 @@ def extract_cobol_files(directory_path: str) -> List[Dict[str, Any]]:
     cobol_files = []
     
     try:
-        # COBOL file extensions
-        cobol_extensions = {'.cob', '.cbl', '.cobol', '.cpy', '.txt'}
+        file_paths = list(_iter_cobol_paths(directory_path))
         
-        # Walk through directory
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                file_ext = Path(file).suffix.lower()
-                
-                if file_ext in cobol_extensions:
-                    try:
-                        parsed_data = parse_cobol_file(file_path)
-                        if parsed_data:
-                            cobol_files.append(parsed_data)
-                    except Exception as e:
-                        logging.error(f"Error parsing {file_path}: {str(e)}")
-                        continue
+        # Files parse independently, so larger directories are spread over
+        # the shared process pool; small ones are not worth the round trips
+        if len(file_paths) < _MIN_PARALLEL_FILES:
+            cobol_files = [parsed for parsed in map(_parse_cobol_path, file_paths) if parsed]
+        else:
+            chunksize = max(1, len(file_paths) // (4 * pool_size()))
+            cobol_files = [
+                parsed for parsed in get_process_pool().map(_parse_cobol_path, file_paths, chunksize=chunksize)
+                if parsed
+            ]
         
         logging.info(f"Successfully extracted {len(cobol_files)} COBOL files")
         return cobol_files
@@ -46,6 +99,94 @@ def extract_cobol_files(directory_path: str) -> List[Dict[str, Any]]:
         logging.error(f"Error extracting COBOL files: {str(e)}")
         return []
 
+def _parse_cobol_path(file_path: str) -> Optional[Dict[str, Any]]:
+    """Parse one file for extract_cobol_files, logging instead of raising"""
+    try:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            # Let parse_cobol_file report the unreadable file
+            return parse_cobol_file(file_path)
+        
+        stamp = [st.st_mtime_ns, st.st_size]
+        cache_file = _ast_cache_path(file_path)
+        ast_data = _cached_ast(cache_file, stamp)
+        if ast_data is not None:
+            # The entry may have been written under another spelling of this path
+            ast_data["file_path"] = file_path
+            ast_data["file_name"] = os.path.basename(file_path)
+            return ast_data
+        
+        ast_data = parse_cobol_file(file_path)
+        if ast_data:
+            _store_cached_ast(cache_file, stamp, ast_data)
+        return ast_data
+    except Exception as e:
+        logging.error(f"Error parsing {file_path}: {str(e)}")
+        return None
+
+def _ast_cache_path(file_path: str) -> str:
+    """Return the AST cache file for a source file"""
+    cache_dir = os.path.expanduser(os.environ.get('COBOL_PARSER_CACHE', '~/.cache/cobol_parser'))
+    digest = hashlib.blake2b(os.fsencode(os.path.abspath(file_path)), digest_size=16).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.json")
+
+def _cached_ast(cache_file: str, stamp: List[int]) -> Optional[Dict[str, Any]]:
+    """Load a cached AST if it was parsed from the file as it is now"""
+    try:
+        with open(cache_file, 'rb') as f:
+            entry = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.warning(f"Ignoring unreadable AST cache entry: {e}")
+        return None
+    
+    if entry.get("version") != AST_CACHE_VERSION or entry.get("stamp") != stamp:
+        return None
+    return entry.get("ast")
+
+def _store_cached_ast(cache_file: str, stamp: List[int], ast_data: Dict[str, Any]):
+    """Atomically write a parsed AST to the cache"""
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"version": AST_CACHE_VERSION, "stamp": stamp, "ast": ast_data}, f)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        logging.warning(f"Failed to write AST cache entry: {e}")
+
+def _iter_cobol_paths(directory_path: str) -> Iterator[str]:
+    """
+    Yield the paths of COBOL files under a directory, top-down like os.walk.
+    
+    Uses os.scandir directly so the entry type comes from the directory
+    listing and the extension check needs no Path object. As with os.walk,
+    symlinked directories are not descended into and unreadable directories
+    are skipped.
+    """
+    pending = [directory_path]
+    while pending:
+        directory = pending.pop()
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirectories.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in _COBOL_EXTENSIONS:
+                        yield entry.path
+        except OSError:
+            continue
+        # Reversed so subdirectories are visited in listing order
+        pending.extend(reversed(subdirectories))
+
 def parse_cobol_file(file_path: str) -> Optional[Dict[str, Any]]:
     """
     Parse a single COBOL file and extract structure.
@@ -57,8 +198,7 @@ def parse_cobol_file(file_path: str) -> Optional[Dict[str, Any]]:
         Dictionary containing parsed program data
     """
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            source_code = f.read()
+        source_code = _read_source(file_path)
         
         # Parse the COBOL source
         ast_data = parse_cobol_to_ast(source_code, file_path)
@@ -69,6 +209,39 @@ def parse_cobol_file(file_path: str) -> Optional[Dict[str, Any]]:
         logging.error(f"Error reading file {file_path}: {str(e)}")
         return None
 
+def _read_source(file_path: str) -> str:
+    """
+    Read a COBOL source file as text, as open(..., encoding='utf-8', errors='ignore') would.
+    
+    The file is read as raw bytes sized from fstat and decoded once, without
+    the buffered text layer; large files are decoded from a memory map so no
+    intermediate bytes copy is made. Universal newlines are applied only when
+    the file contains carriage returns.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        file_size = os.fstat(fd).st_size
+        if file_size >= _MMAP_MIN_SIZE:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as data:
+                source_code = str(data, 'utf-8', 'ignore')
+                has_cr = data.find(b'\r') != -1
+        else:
+            chunks = []
+            while True:
+                chunk = os.read(fd, file_size + 1)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            data = b''.join(chunks)
+            source_code = data.decode('utf-8', 'ignore')
+            has_cr = b'\r' in data
+    finally:
+        os.close(fd)
+    
+    if has_cr:
+        source_code = source_code.replace('\r\n', '\n').replace('\r', '\n')
+    return source_code
+
 def parse_cobol_to_ast(source_code: str, file_path: str = "") -> Dict[str, Any]:
     """
     Parse COBOL source code and create an Abstract Syntax Tree representation.
@@ -81,32 +254,26 @@ def parse_cobol_to_ast(source_code: str, file_path: str = "") -> Dict[str, Any]:
         Dictionary containing AST and metadata
     """
     try:
-        # Clean and normalize source code
-        lines = source_code.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            # Remove line numbers (columns 1-6) if present
-            if len(line) > 6 and line[:6].isdigit():
-                line = line[6:]
-            # Remove sequence area (columns 73-80) if present
-            if len(line) > 72:
-                line = line[:72]
-            cleaned_lines.append(line.rstrip())
-        
-        cleaned_source = '\n'.join(cleaned_lines)
+        # Clean and normalize source code, collecting the line-level
+        # structure in the same pass
+        scan = _scan_source(source_code)
+        cleaned_source = scan['cleaned_source']
+        procedures = scan['procedures']
+        # Uppercased once and shared by every keyword scan below
+        source_upper = _upper(cleaned_source)
         
         # Extract program structure
-        program_id = extract_program_id(cleaned_source)
-        divisions = extract_divisions(cleaned_source)
-        procedures = extract_procedures(cleaned_source)
-        working_storage = extract_working_storage(cleaned_source)
-        file_section = extract_file_section(cleaned_source)
-        dependencies = extract_dependencies(cleaned_source)
-        copybooks = extract_copybooks(cleaned_source)
+        program_id = extract_program_id(cleaned_source, source_upper)
+        divisions = extract_divisions(cleaned_source, source_upper)
+        working_storage = extract_working_storage(cleaned_source, source_upper)
+        file_section = extract_file_section(cleaned_source, source_upper)
+        dependencies = extract_dependencies(cleaned_source, source_upper)
+        copybooks = extract_copybooks(cleaned_source, source_upper)
         
         # Calculate complexity
-        complexity = estimate_complexity(cleaned_source, procedures)
+        complexity = _rate_complexity(
+            scan['code_line_count'], len(procedures), *_count_keywords(source_upper)
+        )
         
         # Build AST structure
         ast_structure = {
@@ -119,7 +286,7 @@ def parse_cobol_to_ast(source_code: str, file_path: str = "") -> Dict[str, Any]:
             "file_section": file_section,
             "dependencies": dependencies,
             "copybooks": copybooks,
-            "line_count": len(lines),
+            "line_count": scan['line_count'],
             "metadata": {
                 "has_file_section": bool(file_section),
                 "has_working_storage": bool(working_storage),
@@ -132,13 +299,14 @@ def parse_cobol_to_ast(source_code: str, file_path: str = "") -> Dict[str, Any]:
         return ast_structure
         
     except Exception as e:
+        # The extractors do not guard themselves; any failure in them ends here
         logging.error(f"Error parsing COBOL AST: {str(e)}")
         return {
             "program_id": "PARSE_ERROR",
             "file_name": os.path.basename(file_path) if file_path else "unknown",
             "file_path": file_path,
             "error": str(e),
-            "line_count": len(source_code.split('\n')) if source_code else 0,
+            "line_count": source_code.count('\n') + 1 if source_code else 0,
             "divisions": [],
             "procedures": [],
             "working_storage": [],
@@ -148,63 +316,187 @@ def parse_cobol_to_ast(source_code: str, file_path: str = "") -> Dict[str, Any]:
             "metadata": {"estimated_complexity": "Unknown"}
         }
 
-def extract_program_id(source: str) -> str:
+def _scan_source(source_code: str) -> Dict[str, Any]:
+    """
+    Normalize COBOL source in a single pass over its lines.
+    
+    The same pass collects everything that is decided line by line: the
+    procedures (as extract_procedures would find them in the cleaned source)
+    and the number of code lines, i.e. neither blank nor comments.
+    
+    Args:
+        source_code: Raw COBOL source code
+    
+    Returns:
+        Dictionary with cleaned_source, line_count, procedures and code_line_count
+    """
+    # Every line is visited, so one split is cheaper than walking the
+    # newlines with str.find, which measured over twice as slow
+    lines = source_code.split('\n')
+    cleaned_lines = []
+    procedures = []
+    code_line_count = 0
+    
+    # The column trimming stays per line: stripping sequence numbers with one
+    # multiline re.sub over the whole source measured about 40% slower than
+    # these slice checks, and the lines are visited here anyway
+    for i, line in enumerate(lines):
+        # Remove line numbers (columns 1-6) if present
+        if len(line) > 6 and line[:6].isdigit():
+            line = line[6:]
+        # Remove sequence area (columns 73-80) if present
+        if len(line) > 72:
+            line = line[:72]
+        line = line.rstrip()
+        cleaned_lines.append(line)
+        
+        line = line.lstrip()
+        
+        # Skip empty lines and comments
+        if not line or line.startswith('*'):
+            continue
+        
+        code_line_count += 1
+        procedure = _procedure_entry(line, i + 1)
+        if procedure:
+            procedures.append(procedure)
+    
+    return {
+        "cleaned_source": '\n'.join(cleaned_lines),
+        "line_count": len(lines),
+        "procedures": procedures,
+        "code_line_count": code_line_count
+    }
+
+def _upper(source: str) -> str:
+    """
+    Uppercase ASCII letters for the keyword patterns, keeping every offset valid.
+    
+    COBOL words are ASCII. str.upper is used when the whole text is ASCII; otherwise
+    only ASCII letters are mapped, since str.upper can change the length of other
+    text ('ß' becomes 'SS') and names are sliced from the original by offset.
+    """
+    if source.isascii():
+        return source.upper()
+    return source.translate(_ASCII_UPPER)
+
+def extract_program_id(source: str, source_upper: Optional[str] = None) -> str:
     """Extract PROGRAM-ID from COBOL source"""
-    try:
-        # Look for PROGRAM-ID pattern
-        pattern = r'PROGRAM-ID\.\s*([A-Za-z0-9\-]+)'
-        match = re.search(pattern, source, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-        
-        # Alternative pattern
-        pattern = r'PROGRAM-ID\s+([A-Za-z0-9\-]+)'
-        match = re.search(pattern, source, re.IGNORECASE)
-        if match:
-            return match.group(1).strip()
-        
-        return "UNKNOWN"
-        
-    except Exception as e:
-        logging.error(f"Error extracting program ID: {str(e)}")
-        return "UNKNOWN"
+    if source_upper is None:
+        source_upper = _upper(source)
+    
+    # Look for PROGRAM-ID pattern
+    match = _PROGRAM_ID_RE.search(source_upper)
+    if match:
+        return source[match.start(1):match.end(1)].strip()
+    
+    # Alternative pattern
+    match = _PROGRAM_ID_ALT_RE.search(source_upper)
+    if match:
+        return source[match.start(1):match.end(1)].strip()
+    
+    return "UNKNOWN"
 
-def extract_divisions(source: str) -> List[Dict[str, Any]]:
+def extract_divisions(source: str, source_upper: Optional[str] = None) -> List[Dict[str, Any]]:
     """Extract division structure from COBOL source"""
     divisions = []
     
-    try:
-        # Common COBOL divisions
-        division_patterns = [
-            r'IDENTIFICATION\s+DIVISION',
-            r'ENVIRONMENT\s+DIVISION',
-            r'DATA\s+DIVISION',
-            r'PROCEDURE\s+DIVISION'
-        ]
-        
-        for pattern in division_patterns:
-            matches = re.finditer(pattern, source, re.IGNORECASE)
-            for match in matches:
-                div_name = match.group(0).replace('DIVISION', '').strip()
-                divisions.append({
-                    "name": div_name,
-                    "start_line": source[:match.start()].count('\n') + 1,
-                    "content": match.group(0)
-                })
-        
-        return divisions
-        
-    except Exception as e:
-        logging.error(f"Error extracting divisions: {str(e)}")
-        return []
+    if source_upper is None:
+        source_upper = _upper(source)
+    
+    # Common COBOL divisions, found in a single scan. Matches arrive in
+    # source order, so line numbers are counted forward from the previous
+    # match instead of recounting the whole prefix each time. This is the
+    # only extractor that needs absolute line numbers (procedures get them
+    # from _scan_source), so a shared newline offset table searched with
+    # bisect would not pay for itself; building one measured slower.
+    line_number = 1
+    counted_to = 0
+    for match in _DIVISION_RE.finditer(source_upper):
+        line_number += source.count('\n', counted_to, match.start())
+        counted_to = match.start()
+        content = source[match.start():match.end()]
+        div_name = content.replace('DIVISION', '').strip()
+        divisions.append((match.lastindex, {
+            "name": div_name,
+            "start_line": line_number,
+            "content": content
+        }))
+    
+    # Report them grouped by division, as the former per-division scans did
+    divisions.sort(key=lambda item: item[0])
+    return [division for _, division in divisions]
 
 def extract_procedures(source: str) -> List[Dict[str, Any]]:
     """Extract procedure/paragraph definitions"""
     procedures = []
     
-    try:
-        # Look for paragraph names (labels followed by period)
-        lines = source.split('\n')
+    # Look for paragraph names (labels followed by period). One multiline
+    # regex for labels and PERFORMs over the whole source measured no
+    # faster than this loop: with no literal prefix to search for, re
+    # still tries a match at every offset.
+    lines = source.split('\n')
+    
+    for i, line in enumerate(lines):
+        line = line.strip()
+        
+        # Skip empty lines and comments
+        if not line or line.startswith('*'):
+            continue
+        
+        procedure = _procedure_entry(line, i + 1)
+        if procedure:
+            procedures.append(procedure)
+    
+    return procedures
+
+def _procedure_entry(line: str, line_number: int) -> Optional[Dict[str, Any]]:
+    """Procedure entry for a stripped code line, or None if it names no procedure"""
+    # Look for paragraph labels (alphanumeric followed by period); the
+    # endswith test is a cheap check that rules out most lines before
+    # the regex is entered
+    if line.endswith('.') and _PARAGRAPH_RE.match(line):
+        paragraph_name = line.rstrip('.')
+        return {
+            "name": paragraph_name,
+            "type": "paragraph",
+            "line_number": line_number,
+            "content": line
+        }
+    
+    # Look for PERFORM statements
+    line_upper = _upper(line)
+    if 'PERFORM' in line_upper:
+        perform_match = _PERFORM_RE.search(line_upper)
+        if perform_match:
+            called_proc = line[perform_match.start(1):perform_match.end(1)]
+            return {
+                "name": called_proc,
+                "type": "called_procedure",
+                "line_number": line_number,
+                "content": line
+            }
+    
+    return None
+
+def extract_working_storage(source: str, source_upper: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Extract working storage section variables"""
+    # Entries stay plain dicts rather than packed parallel arrays: ingest.py
+    # stores them in a JSON column and the converter slices and iterates them
+    variables = []
+    
+    if source_upper is None:
+        source_upper = _upper(source)
+    # Substring tests are far cheaper than a regex search that fails
+    if 'WORKING-STORAGE' not in source_upper:
+        return variables
+    
+    # Find WORKING-STORAGE SECTION
+    ws_match = _WORKING_STORAGE_RE.search(source_upper)
+    
+    if ws_match:
+        ws_content = source[ws_match.start(1):ws_match.end(1)]
+        lines = ws_content.split('\n')
         
         for i, line in enumerate(lines):
             line = line.strip()
@@ -213,182 +505,119 @@ def extract_procedures(source: str) -> List[Dict[str, Any]]:
             if not line or line.startswith('*'):
                 continue
             
-            # Look for paragraph labels (alphanumeric followed by period)
-            if re.match(r'^[A-Za-z][A-Za-z0-9\-]*\.$', line):
-                paragraph_name = line.rstrip('.')
-                procedures.append({
-                    "name": paragraph_name,
-                    "type": "paragraph",
-                    "line_number": i + 1,
-                    "content": line
+            # Look for variable definitions (level numbers). Testing the
+            # two digits and the space with str methods before the match
+            # measured no faster: an anchored match fails on the first char
+            level_match = _LEVEL_RE.match(line)
+            if level_match:
+                level = level_match.group(1)
+                var_name = level_match.group(2)
+                
+                variables.append({
+                    "level": int(level),
+                    "name": var_name,
+                    "definition": line,
+                    "line_number": i + 1
                 })
-            
-            # Look for PERFORM statements
-            elif 'PERFORM' in line.upper():
-                perform_match = re.search(r'PERFORM\s+([A-Za-z][A-Za-z0-9\-]*)', line, re.IGNORECASE)
-                if perform_match:
-                    called_proc = perform_match.group(1)
-                    procedures.append({
-                        "name": called_proc,
-                        "type": "called_procedure",
-                        "line_number": i + 1,
-                        "content": line.strip()
-                    })
-        
-        return procedures
-        
-    except Exception as e:
-        logging.error(f"Error extracting procedures: {str(e)}")
-        return []
-
-def extract_working_storage(source: str) -> List[Dict[str, Any]]:
-    """Extract working storage section variables"""
-    variables = []
     
-    try:
-        # Find WORKING-STORAGE SECTION
-        ws_pattern = r'WORKING-STORAGE\s+SECTION\.(.*?)(?=\n\s*[A-Z\-]+\s+SECTION\.|\nPROCEDURE\s+DIVISION|$)'
-        ws_match = re.search(ws_pattern, source, re.IGNORECASE | re.DOTALL)
-        
-        if ws_match:
-            ws_content = ws_match.group(1)
-            lines = ws_content.split('\n')
-            
-            for i, line in enumerate(lines):
-                line = line.strip()
-                
-                # Skip empty lines and comments
-                if not line or line.startswith('*'):
-                    continue
-                
-                # Look for variable definitions (level numbers)
-                level_match = re.match(r'^(\d{2})\s+([A-Za-z][A-Za-z0-9\-]*)', line)
-                if level_match:
-                    level = level_match.group(1)
-                    var_name = level_match.group(2)
-                    
-                    variables.append({
-                        "level": int(level),
-                        "name": var_name,
-                        "definition": line,
-                        "line_number": i + 1
-                    })
-        
-        return variables
-        
-    except Exception as e:
-        logging.error(f"Error extracting working storage: {str(e)}")
-        return []
+    return variables
 
-def extract_file_section(source: str) -> List[Dict[str, Any]]:
+def extract_file_section(source: str, source_upper: Optional[str] = None) -> List[Dict[str, Any]]:
     """Extract file section definitions"""
     files = []
     
-    try:
-        # Find FILE SECTION
-        fs_pattern = r'FILE\s+SECTION\.(.*?)(?=\n\s*[A-Z\-]+\s+SECTION\.|\nWORKING-STORAGE|$)'
-        fs_match = re.search(fs_pattern, source, re.IGNORECASE | re.DOTALL)
-        
-        if fs_match:
-            fs_content = fs_match.group(1)
-            
-            # Look for FD (File Description) entries
-            fd_pattern = r'FD\s+([A-Za-z][A-Za-z0-9\-]*)'
-            fd_matches = re.finditer(fd_pattern, fs_content, re.IGNORECASE)
-            
-            for match in fd_matches:
-                file_name = match.group(1)
-                files.append({
-                    "name": file_name,
-                    "type": "file_description",
-                    "definition": match.group(0)
-                })
-        
+    if source_upper is None:
+        source_upper = _upper(source)
+    # FILE and SECTION may be split by any whitespace, so test them apart
+    if 'FILE' not in source_upper or 'SECTION.' not in source_upper:
         return files
-        
-    except Exception as e:
-        logging.error(f"Error extracting file section: {str(e)}")
-        return []
+    
+    # Find FILE SECTION
+    fs_match = _FILE_SECTION_RE.search(source_upper)
+    
+    if fs_match:
+        # Look for FD (File Description) entries
+        fd_matches = _FD_RE.finditer(source_upper, fs_match.start(1), fs_match.end(1))
+        
+        for match in fd_matches:
+            file_name = source[match.start(1):match.end(1)]
+            files.append({
+                "name": file_name,
+                "type": "file_description",
+                "definition": source[match.start():match.end()]
+            })
+    
+    return files
 
-def extract_dependencies(source: str) -> List[str]:
+def extract_dependencies(source: str, source_upper: Optional[str] = None) -> List[str]:
     """Extract program dependencies (CALL statements)"""
-    dependencies = set()
+    static_deps = []
+    dynamic_deps = []
     
-    try:
-        # Look for CALL statements
-        call_pattern = r'CALL\s+[\'"]([A-Za-z0-9\-]+)[\'"]'
-        call_matches = re.finditer(call_pattern, source, re.IGNORECASE)
-        
-        for match in call_matches:
-            called_program = match.group(1)
-            dependencies.add(called_program)
-        
-        # Look for CALL with variables
-        call_var_pattern = r'CALL\s+([A-Za-z][A-Za-z0-9\-]*)'
-        call_var_matches = re.finditer(call_var_pattern, source, re.IGNORECASE)
-        
-        for match in call_var_matches:
-            called_var = match.group(1)
-            if not called_var.startswith('"') and not called_var.startswith("'"):
-                dependencies.add(f"DYNAMIC:{called_var}")
-        
-        return list(dependencies)
-        
-    except Exception as e:
-        logging.error(f"Error extracting dependencies: {str(e)}")
-        return []
+    if source_upper is None:
+        source_upper = _upper(source)
+    
+    # Look for CALL statements, both literal and through variables
+    for match in _CALL_RE.finditer(source_upper):
+        if match.start(1) >= 0:
+            static_deps.append(source[match.start(1):match.end(1)])
+        else:
+            dynamic_deps.append(f"DYNAMIC:{source[match.start(2):match.end(2)]}")
+    
+    # Deduplicate, keeping the order the calls appear in
+    return list(dict.fromkeys(static_deps + dynamic_deps))
 
-def extract_copybooks(source: str) -> List[str]:
+def extract_copybooks(source: str, source_upper: Optional[str] = None) -> List[str]:
     """Extract copybook dependencies (COPY statements)"""
     copybooks = set()
     
-    try:
-        # Look for COPY statements
-        copy_pattern = r'COPY\s+([A-Za-z0-9\-]+)'
-        copy_matches = re.finditer(copy_pattern, source, re.IGNORECASE)
-        
-        for match in copy_matches:
-            copybook = match.group(1)
-            copybooks.add(copybook)
-        
-        return list(copybooks)
-        
-    except Exception as e:
-        logging.error(f"Error extracting copybooks: {str(e)}")
+    if source_upper is None:
+        source_upper = _upper(source)
+    if 'COPY' not in source_upper:
         return []
+    
+    # Look for COPY statements
+    copy_matches = _COPY_RE.finditer(source_upper)
+    
+    for match in copy_matches:
+        copybook = source[match.start(1):match.end(1)]
+        copybooks.add(copybook)
+    
+    return list(copybooks)
 
 def estimate_complexity(source: str, procedures: List[Dict[str, Any]]) -> str:
     """Estimate program complexity based on various metrics"""
-    try:
-        lines = source.split('\n')
-        non_empty_lines = [line for line in lines if line.strip() and not line.strip().startswith('*')]
-        
-        # Count various complexity indicators
-        line_count = len(non_empty_lines)
-        procedure_count = len(procedures)
-        
-        # Count conditional statements
-        if_count = len(re.findall(r'\bIF\b', source, re.IGNORECASE))
-        perform_count = len(re.findall(r'\bPERFORM\b', source, re.IGNORECASE))
-        call_count = len(re.findall(r'\bCALL\b', source, re.IGNORECASE))
-        
-        # Calculate complexity score
-        complexity_score = (
-            line_count * 0.1 +
-            procedure_count * 2 +
-            if_count * 1.5 +
-            perform_count * 1 +
-            call_count * 2
-        )
-        
-        # Classify complexity
-        if complexity_score < 50:
-            return "Low"
-        elif complexity_score < 150:
-            return "Medium"
-        else:
-            return "High"
-            
-    except Exception as e:
-        logging.error(f"Error estimating complexity: {str(e)}")
-        return "Unknown"
+    lines = source.split('\n')
+    non_empty_lines = [line for line in lines if line.strip() and not line.strip().startswith('*')]
+    
+    return _rate_complexity(len(non_empty_lines), len(procedures), *_count_keywords(_upper(source)))
+
+def _count_keywords(source_upper: str) -> tuple:
+    """Count the IF, PERFORM and CALL words in uppercased source with one scan"""
+    counts = [0, 0, 0, 0]
+    for match in _KEYWORD_WORD_RE.finditer(source_upper):
+        counts[match.lastindex] += 1
+    return counts[1], counts[2], counts[3]
+
+def _rate_complexity(line_count: int,
+                     procedure_count: int,
+                     if_count: int,
+                     perform_count: int,
+                     call_count: int) -> str:
+    """Classify complexity from the code line, procedure and keyword counts"""
+    # Calculate complexity score
+    complexity_score = (
+        line_count * 0.1 +
+        procedure_count * 2 +
+        if_count * 1.5 +
+        perform_count * 1 +
+        call_count * 2
+    )
+    
+    # Classify complexity
+    if complexity_score < 50:
+        return "Low"
+    elif complexity_score < 150:
+        return "Medium"
+    else:
+        return "High"
@@ -3,15 +3,39 @@ COCO LLM Service Integration
 Advanced COBOL analysis using specialized LLM trained on mainframe systems
 """
 import os
+import re
+import copy
 import json
 import time
-import uuid
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate, count
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# PROGRAM-ID with or without its period, in uppercased source
+_PROGRAM_ID_RE = re.compile(r'PROGRAM-ID(?:\.\s*|\s+)([A-Z0-9\-]+)')
+
+# Decision points for cyclomatic complexity, matched as whole words in
+# uppercased source; the lookahead lets re skip ahead by first character
+_CYCLO_RE = re.compile(
+    r'(?=[IEWPUGCO])\b(?:IF|ELSE|EVALUATE|WHEN|PERFORM|UNTIL|WHILE|GO\s+TO|CALL|ON\s+SIZE\s+ERROR|ON\s+OVERFLOW)\b'
+)
+
+# Rating tiers as sorted thresholds and one label per tier. Tiers whose
+# upper bound is inclusive are looked up with bisect_left, those whose
+# lower bound is inclusive with bisect_right.
+_RATING_THRESHOLDS = (10, 20, 50)
+_RATING_LABELS = ('Low', 'Moderate', 'High', 'Very High')
+_PRIORITY_THRESHOLDS = (40, 70)
+_RESOURCE_THRESHOLDS = (1000, 5000)
+_TIER_LABELS = ('Low', 'Medium', 'High')
+
 class COCOLLMService:
     """
     COCO LLM service for advanced COBOL analysis and documentation generation
@@ -28,25 +52,45 @@ class COCOLLMService:
             "complexity_assessment",
             "security_analysis"
         ]
+        # Completed analyses keyed by a digest of the source, least recently
+        # used first, so resubmitting an unchanged program skips every pass
+        self._analysis_cache = OrderedDict()
+        self._analysis_cache_max = 256
+        self._analysis_cache_lock = threading.Lock()
+        # Analysis IDs only correlate results, so a per-process counter
+        # prefixed with the pid replaces a uuid4 read from urandom
+        self._seq = count()
         logger.info(f"Initialized {self.service_name} v{self.version}")
     
     def analyze_cobol_program(self, cobol_code: str, filename: str = "unknown.cbl") -> Dict[str, Any]:
         """
         Comprehensive COBOL program analysis using COCO LLM intelligence
         """
+        timestamp = time.time()
         try:
-            analysis_id = str(uuid.uuid4())
-            timestamp = time.time()
+            analysis_id = f"{os.getpid():x}-{next(self._seq):x}-{int(timestamp * 1000):x}"
+            
+            cache_key = hashlib.blake2b(cobol_code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+            cached = self._get_cached_analysis(cache_key)
+            if cached is not None:
+                cached.update(analysis_id=analysis_id, timestamp=timestamp, filename=filename)
+                return cached
+            
+            # Uppercased once and shared by the keyword scans below
+            cobol_code_upper = cobol_code.upper()
+            upper_lines = cobol_code_upper.splitlines()
             
             # Extract program identification
-            program_name = self._extract_program_id(cobol_code)
+            program_name = self._extract_program_id(cobol_code_upper)
             
             # Perform multi-dimensional analysis
-            structure_analysis = self._analyze_program_structure(cobol_code)
-            complexity_metrics = self._calculate_complexity_metrics(cobol_code, structure_analysis)
-            security_assessment = self._assess_security_vulnerabilities(cobol_code)
-            modernization_analysis = self._analyze_modernization_potential(cobol_code, structure_analysis)
-            performance_analysis = self._analyze_performance_characteristics(cobol_code, structure_analysis)
+            structure_analysis, cognitive_complexity = self._scan_program(cobol_code)
+            complexity_metrics = self._calculate_complexity_metrics(
+                cobol_code_upper, cognitive_complexity, structure_analysis
+            )
+            security_assessment = self._assess_security_vulnerabilities(cobol_code_upper, upper_lines)
+            modernization_analysis = self._analyze_modernization_potential(cobol_code_upper, structure_analysis)
+            performance_analysis = self._analyze_performance_characteristics(cobol_code_upper, structure_analysis)
             
             # Generate comprehensive documentation
             documentation = self._generate_comprehensive_documentation(
@@ -67,7 +111,7 @@ class COCOLLMService:
                 complexity_metrics, security_assessment, performance_analysis
             )
             
-            return {
+            analysis = {
                 "analysis_id": analysis_id,
                 "timestamp": timestamp,
                 "program_name": program_name,
@@ -91,29 +135,49 @@ class COCOLLMService:
                     modernization_analysis, quality_score
                 )
             }
-            
+            self._put_cached_analysis(cache_key, analysis)
+            return analysis
+        
         except Exception as e:
             logger.error(f"COCO LLM analysis failed: {str(e)}")
             return {
                 "error": str(e),
                 "analysis_failed": True,
-                "timestamp": time.time()
+                "timestamp": timestamp
             }
     
-    def _extract_program_id(self, cobol_code: str) -> str:
-        """Extract PROGRAM-ID from COBOL source"""
-        for line in cobol_code.splitlines():
-            line = line.strip().upper()
-            if "PROGRAM-ID" in line:
-                parts = line.split(".")
-                if len(parts) > 0:
-                    name_parts = parts[0].split()
-                    if len(name_parts) > 1:
-                        return name_parts[-1]
-        return "UNKNOWN-PROGRAM"
+    def _get_cached_analysis(self, cache_key: bytes) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached analysis, marking it as recently used"""
+        with self._analysis_cache_lock:
+            analysis = self._analysis_cache.get(cache_key)
+            if analysis is None:
+                return None
+            self._analysis_cache.move_to_end(cache_key)
+        return copy.deepcopy(analysis)
+    
+    def _put_cached_analysis(self, cache_key: bytes, analysis: Dict[str, Any]):
+        """Cache a copy of an analysis, evicting the least recently used beyond the limit"""
+        analysis = copy.deepcopy(analysis)
+        with self._analysis_cache_lock:
+            self._analysis_cache[cache_key] = analysis
+            self._analysis_cache.move_to_end(cache_key)
+            while len(self._analysis_cache) > self._analysis_cache_max:
+                self._analysis_cache.popitem(last=False)
+    
+    def _extract_program_id(self, cobol_code_upper: str) -> str:
+        """Extract PROGRAM-ID from uppercased COBOL source"""
+        match = _PROGRAM_ID_RE.search(cobol_code_upper)
+        return match.group(1) if match else "UNKNOWN-PROGRAM"
     
     def _analyze_program_structure(self, cobol_code: str) -> Dict[str, Any]:
         """Analyze COBOL program structure with COCO LLM intelligence"""
+        return self._scan_program(cobol_code)[0]
+    
+    def _scan_program(self, cobol_code: str) -> tuple:
+        """
+        Analyze program structure and cognitive complexity in one pass over the lines
+        Returns the structure and the cognitive complexity score
+        """
         lines = cobol_code.splitlines()
         structure = {
             "total_lines": len(lines),
@@ -131,40 +195,66 @@ class COCOLLMService:
         
         current_division = None
         current_section = None
+        cognitive_score = 0
+        nesting_level = 0
         
+        nesting_keywords = ("IF", "PERFORM", "EVALUATE")
+        complexity_keywords = ("GO TO", "ALTER", "EXIT")
+        
+        # One pass over the lines with plain substring tests. A single regex
+        # alternation tagging each line's role measured several times slower,
+        # and one line can hold several roles (a CALL and a COPY, say).
         for line_num, line in enumerate(lines, 1):
-            original_line = line
             line = line.strip()
             
-            # Count line types
+            # Count line types here: the loop has to skip blank and comment
+            # lines anyway, and tallying them in separate passes over a
+            # stripped copy of the lines measured slower
             if not line:
                 structure["blank_lines"] += 1
                 continue
-            elif line.startswith("*") or line.startswith("//"):
+            line_upper = line.upper()
+            
+            # Difficult constructs add to cognitive complexity wherever
+            # they appear, comment lines included
+            for keyword in complexity_keywords:
+                if keyword in line_upper:
+                    cognitive_score += 2
+            
+            if line.startswith(("*", "//")):
                 structure["comment_lines"] += 1
                 continue
-            else:
-                structure["code_lines"] += 1
+            structure["code_lines"] += 1
+            
+            # Cognitive nesting opens on IF/PERFORM/EVALUATE, closes on END-
+            if line_upper.startswith(nesting_keywords):
+                nesting_level += 1
+                cognitive_score += nesting_level
+            if line_upper.startswith("END-"):
+                nesting_level = max(0, nesting_level - 1)
             
-            # Identify divisions
-            if "DIVISION" in line.upper():
-                if "IDENTIFICATION" in line.upper():
+            # Identify divisions; each spans the lines up to the next one
+            if "DIVISION" in line_upper:
+                previous_division = current_division
+                if "IDENTIFICATION" in line_upper:
                     current_division = "IDENTIFICATION"
-                elif "ENVIRONMENT" in line.upper():
+                elif "ENVIRONMENT" in line_upper:
                     current_division = "ENVIRONMENT"
-                elif "DATA" in line.upper():
+                elif "DATA" in line_upper:
                     current_division = "DATA"
-                elif "PROCEDURE" in line.upper():
+                elif "PROCEDURE" in line_upper:
                     current_division = "PROCEDURE"
                 
                 if current_division:
+                    if previous_division:
+                        structure["divisions"][previous_division]["end_line"] = line_num - 1
                     structure["divisions"][current_division] = {
                         "start_line": line_num,
-                        "content": []
+                        "end_line": len(lines)
                     }
             
             # Identify sections
-            if "SECTION" in line.upper():
+            if "SECTION" in line_upper:
                 section_name = line.split()[0] if line.split() else "UNNAMED"
                 current_section = section_name
                 structure["sections"].append({
@@ -173,30 +263,31 @@ class COCOLLMService:
                     "division": current_division
                 })
             
-            # Extract working storage variables
-            if current_division == "DATA" and current_section == "WORKING-STORAGE":
-                if line.startswith("01 ") or line.startswith("77 "):
-                    var_parts = line.split()
-                    if len(var_parts) >= 2:
-                        structure["working_storage"].append({
-                            "level": var_parts[0],
-                            "name": var_parts[1],
+            if current_division == "DATA":
+                # Extract working storage variables
+                if current_section == "WORKING-STORAGE":
+                    if line.startswith(("01 ", "77 ")):
+                        var_parts = line.split()
+                        if len(var_parts) >= 2:
+                            structure["working_storage"].append({
+                                "level": var_parts[0],
+                                "name": var_parts[1],
+                                "line": line_num,
+                                "definition": line
+                            })
+                
+                # Extract file section information
+                elif current_section == "FILE":
+                    if "FD " in line_upper or "SD " in line_upper:
+                        structure["file_section"].append({
+                            "type": "FILE_DESCRIPTOR",
                             "line": line_num,
                             "definition": line
                         })
             
-            # Extract file section information
-            if current_division == "DATA" and current_section == "FILE":
-                if "FD " in line.upper() or "SD " in line.upper():
-                    structure["file_section"].append({
-                        "type": "FILE_DESCRIPTOR",
-                        "line": line_num,
-                        "definition": line
-                    })
-            
             # Extract procedure paragraphs
-            if current_division == "PROCEDURE":
-                if line.endswith(".") and not line.startswith("IF") and not line.startswith("ELSE"):
+            elif current_division == "PROCEDURE":
+                if line.endswith(".") and not line.startswith(("IF", "ELSE")):
                     para_name = line.replace(".", "").strip()
                     if para_name and para_name[0].isalpha():
                         structure["procedures"].append({
@@ -206,8 +297,8 @@ class COCOLLMService:
                         })
             
             # Extract dependencies (CALL statements)
-            if "CALL " in line.upper():
-                call_parts = line.upper().split("CALL ")
+            if "CALL " in line_upper:
+                call_parts = line_upper.split("CALL ")
                 if len(call_parts) > 1:
                     called_program = call_parts[1].split()[0].strip('"\'')
                     structure["dependencies"].append({
@@ -217,31 +308,32 @@ class COCOLLMService:
                     })
             
             # Extract copybook dependencies
-            if "COPY " in line.upper():
-                copy_parts = line.upper().split("COPY ")
+            if "COPY " in line_upper:
+                copy_parts = line_upper.split("COPY ")
                 if len(copy_parts) > 1:
                     copybook = copy_parts[1].split()[0].strip('"\'.')
                     structure["copybooks"].append({
                         "name": copybook,
                         "line": line_num
                     })
-            
-            # Add line to current division
-            if current_division and current_division in structure["divisions"]:
-                structure["divisions"][current_division]["content"].append({
-                    "line_num": line_num,
-                    "content": original_line
-                })
         
-        return structure
+        return structure, cognitive_score
+    
+    def get_division_content(self, cobol_code: str, structure: Dict, division: str) -> List[str]:
+        """Return the source lines of a division found by the structure analysis"""
+        division_info = structure.get("divisions", {}).get(division)
+        if not division_info:
+            return []
+        lines = cobol_code.splitlines()
+        return lines[division_info["start_line"] - 1:division_info["end_line"]]
     
-    def _calculate_complexity_metrics(self, cobol_code: str, structure: Dict) -> Dict[str, Any]:
+    def _calculate_complexity_metrics(self, cobol_code_upper: str, cognitive_complexity: int,
+                                      structure: Dict) -> Dict[str, Any]:
         """Calculate comprehensive complexity metrics using COCO LLM knowledge"""
         # Cyclomatic complexity calculation
-        cyclomatic_complexity = self._calculate_cyclomatic_complexity(cobol_code)
+        cyclomatic_complexity = self._calculate_cyclomatic_complexity(cobol_code_upper)
         
-        # Cognitive complexity (readability factor)
-        cognitive_complexity = self._calculate_cognitive_complexity(cobol_code)
+        # Cognitive complexity (readability factor) comes from the structure scan
         
         # Maintainability index
         maintainability_index = self._calculate_maintainability_index(structure, cyclomatic_complexity)
@@ -264,50 +356,10 @@ class COCOLLMService:
             "lines_of_code": structure.get("code_lines", 0)
         }
     
-    def _calculate_cyclomatic_complexity(self, cobol_code: str) -> int:
-        """Calculate cyclomatic complexity for COBOL code"""
-        complexity = 1  # Base complexity
-        
-        decision_keywords = [
-            "IF", "ELSE", "EVALUATE", "WHEN", "PERFORM", "UNTIL", "WHILE", 
-            "GO TO", "CALL", "ON SIZE ERROR", "ON OVERFLOW"
-        ]
-        
-        for line in cobol_code.upper().splitlines():
-            line = line.strip()
-            for keyword in decision_keywords:
-                if keyword in line:
-                    complexity += 1
-        
-        return complexity
-    
-    def _calculate_cognitive_complexity(self, cobol_code: str) -> int:
-        """Calculate cognitive complexity (how hard it is to understand)"""
-        cognitive_score = 0
-        nesting_level = 0
-        
-        nesting_keywords = ["IF", "PERFORM", "EVALUATE"]
-        complexity_keywords = ["GO TO", "ALTER", "EXIT"]
-        
-        for line in cobol_code.upper().splitlines():
-            line = line.strip()
-            
-            # Increase nesting
-            for keyword in nesting_keywords:
-                if line.startswith(keyword):
-                    nesting_level += 1
-                    cognitive_score += nesting_level
-            
-            # Decrease nesting
-            if line.startswith("END-"):
-                nesting_level = max(0, nesting_level - 1)
-            
-            # Add complexity for difficult constructs
-            for keyword in complexity_keywords:
-                if keyword in line:
-                    cognitive_score += 2
-        
-        return cognitive_score
+    def _calculate_cyclomatic_complexity(self, cobol_code_upper: str) -> int:
+        """Calculate cyclomatic complexity for uppercased COBOL source"""
+        # Base complexity plus one per decision keyword, in a single scan
+        return 1 + len(_CYCLO_RE.findall(cobol_code_upper))
     
     def _calculate_maintainability_index(self, structure: Dict, cyclomatic_complexity: int) -> float:
         """Calculate maintainability index (0-100 scale)"""
@@ -330,17 +382,10 @@ class COCOLLMService:
     
     def _get_complexity_rating(self, cyclomatic_complexity: int) -> str:
         """Get complexity rating based on cyclomatic complexity"""
-        if cyclomatic_complexity <= 10:
-            return "Low"
-        elif cyclomatic_complexity <= 20:
-            return "Moderate"
-        elif cyclomatic_complexity <= 50:
-            return "High"
-        else:
-            return "Very High"
+        return _RATING_LABELS[bisect_left(_RATING_THRESHOLDS, cyclomatic_complexity)]
     
-    def _assess_security_vulnerabilities(self, cobol_code: str) -> Dict[str, Any]:
-        """Assess security vulnerabilities using COCO LLM knowledge"""
+    def _assess_security_vulnerabilities(self, cobol_code_upper: str, upper_lines: List[str]) -> Dict[str, Any]:
+        """Assess security vulnerabilities in uppercased source using COCO LLM knowledge"""
         vulnerabilities = []
         risk_level = "Low"
         
@@ -353,21 +398,37 @@ class COCOLLMService:
             ("DISPLAY", "Potential information disclosure", "Low")
         ]
         
-        for line in cobol_code.upper().splitlines():
-            for pattern, description, severity in security_checks:
-                if pattern in line:
-                    vulnerabilities.append({
-                        "pattern": pattern,
-                        "description": description,
-                        "severity": severity,
-                        "line_content": line.strip()
-                    })
-                    
-                    # Update overall risk level
-                    if severity == "High" and risk_level in ["Low", "Medium"]:
-                        risk_level = "High"
-                    elif severity == "Medium" and risk_level == "Low":
-                        risk_level = "Medium"
+        # Each pattern is found with str.find over the whole source and mapped
+        # to its line, rather than testing every pattern against every line
+        line_hits = {}  # line index -> indexes of the checks found on it
+        line_ends = None
+        for check_index, (pattern, _, _) in enumerate(security_checks):
+            pos = cobol_code_upper.find(pattern)
+            while pos != -1:
+                if line_ends is None:
+                    # End offset of each line, split exactly as splitlines() splits
+                    line_ends = list(accumulate(map(len, cobol_code_upper.splitlines(True))))
+                line_index = bisect_right(line_ends, pos)
+                line_hits.setdefault(line_index, set()).add(check_index)
+                # A pattern is reported once per line, so resume on the next one
+                pos = cobol_code_upper.find(pattern, line_ends[line_index])
+        
+        for line_index in sorted(line_hits):
+            line = upper_lines[line_index]
+            for check_index in sorted(line_hits[line_index]):
+                pattern, description, severity = security_checks[check_index]
+                vulnerabilities.append({
+                    "pattern": pattern,
+                    "description": description,
+                    "severity": severity,
+                    "line_content": line.strip()
+                })
+                
+                # Update overall risk level
+                if severity == "High" and risk_level in ["Low", "Medium"]:
+                    risk_level = "High"
+                elif severity == "Medium" and risk_level == "Low":
+                    risk_level = "Medium"
         
         return {
             "risk_level": risk_level,
@@ -391,8 +452,8 @@ class COCOLLMService:
             
         return recommendations
     
-    def _analyze_modernization_potential(self, cobol_code: str, structure: Dict) -> Dict[str, Any]:
-        """Analyze modernization opportunities and challenges"""
+    def _analyze_modernization_potential(self, cobol_code_upper: str, structure: Dict) -> Dict[str, Any]:
+        """Analyze modernization opportunities and challenges in uppercased source"""
         modernization_opportunities = []
         modernization_challenges = []
         
@@ -400,14 +461,14 @@ class COCOLLMService:
         if len(structure.get("procedures", [])) > 20:
             modernization_opportunities.append("Break down large procedures into smaller modules")
         
-        if "GO TO" in cobol_code.upper():
+        if "GO TO" in cobol_code_upper:
             modernization_opportunities.append("Replace GO TO statements with structured programming")
         
         if len(structure.get("dependencies", [])) > 5:
             modernization_opportunities.append("Consider microservices architecture")
         
         # Check for modernization challenges
-        if "ALTER" in cobol_code.upper():
+        if "ALTER" in cobol_code_upper:
             modernization_challenges.append("ALTER statements complicate migration")
         
         if len(structure.get("copybooks", [])) > 10:
@@ -419,12 +480,7 @@ class COCOLLMService:
         modernization_score = max(0, opportunity_score - challenge_penalty)
         
         # Determine priority
-        if modernization_score >= 70:
-            priority = "High"
-        elif modernization_score >= 40:
-            priority = "Medium"
-        else:
-            priority = "Low"
+        priority = _TIER_LABELS[bisect_right(_PRIORITY_THRESHOLDS, modernization_score)]
         
         return {
             "modernization_score": modernization_score,
@@ -473,18 +529,18 @@ class COCOLLMService:
         
         return technologies
     
-    def _analyze_performance_characteristics(self, cobol_code: str, structure: Dict) -> Dict[str, Any]:
-        """Analyze performance characteristics and bottlenecks"""
+    def _analyze_performance_characteristics(self, cobol_code_upper: str, structure: Dict) -> Dict[str, Any]:
+        """Analyze performance characteristics and bottlenecks in uppercased source"""
         performance_issues = []
         
         # Check for performance anti-patterns
-        if "PERFORM UNTIL" in cobol_code.upper():
+        if "PERFORM UNTIL" in cobol_code_upper:
             performance_issues.append("Potential infinite loop risk")
         
         if len(structure.get("working_storage", [])) > 100:
             performance_issues.append("Large working storage may impact memory usage")
         
-        if cobol_code.upper().count("SORT") > 5:
+        if cobol_code_upper.count("SORT") > 5:
             performance_issues.append("Multiple sort operations may impact performance")
         
         # Calculate performance score
@@ -516,15 +572,7 @@ class COCOLLMService:
         """Estimate resource usage characteristics"""
         loc = structure.get("code_lines", 0)
         
-        if loc > 5000:
-            memory_usage = "High"
-            cpu_usage = "High"
-        elif loc > 1000:
-            memory_usage = "Medium"
-            cpu_usage = "Medium"
-        else:
-            memory_usage = "Low"
-            cpu_usage = "Low"
+        memory_usage = cpu_usage = _TIER_LABELS[bisect_left(_RESOURCE_THRESHOLDS, loc)]
         
         return {
             "memory_usage": memory_usage,
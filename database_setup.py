@@ -56,6 +56,59 @@ def find_programs_with_dependencies(dependency):
         logging.error(f"Database error: {e}")
         return []
 
+# Columns added to existing tables after their first release, as
+# (table, column). db.create_all() creates missing tables but never alters
+# existing ones, so add_missing_columns() adds these at startup.
+_ADDED_COLUMNS = (
+    ('system_stats', 'common_dependencies'),
+)
+
+def add_missing_columns():
+    """Startup migration: add columns introduced since a table was created"""
+    from sqlalchemy import inspect, text
+    from app import db
+    try:
+        inspector = inspect(db.engine)
+        with db.engine.begin() as connection:
+            for table_name, column_name in _ADDED_COLUMNS:
+                if not inspector.has_table(table_name):
+                    continue
+                if column_name in {column['name'] for column in inspector.get_columns(table_name)}:
+                    continue
+                column = db.metadata.tables[table_name].c[column_name]
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}'))
+                logging.info(f"Added column {table_name}.{column_name}")
+        return True
+    except Exception as e:
+        logging.error(f"Database migration error: {e}")
+        return False
+
+def normalize_program_dependencies():
+    """Startup migration: rewrite legacy string dependencies as lists"""
+    from models import CobolProgram
+    from app import db
+    try:
+        # Only two columns are read, and only rows still holding a bare
+        # string are loaded and rewritten
+        legacy_ids = [
+            program_id
+            for program_id, dependencies in db.session.query(CobolProgram.id, CobolProgram.dependencies)
+            if isinstance(dependencies, str)
+        ]
+        for program_id in legacy_ids:
+            program = db.session.get(CobolProgram, program_id)
+            # Assignment runs CobolProgram.validate_dependencies
+            program.dependencies = program.dependencies
+        db.session.commit()
+        if legacy_ids:
+            logging.info(f"Normalized dependencies for {len(legacy_ids)} programs")
+        return len(legacy_ids)
+    except Exception as e:
+        logging.error(f"Database error: {e}")
+        db.session.rollback()
+        return 0
+
 def delete_all_programs():
     """Delete all programs from database"""
     from models import CobolProgram
@@ -2,16 +2,18 @@
 Enhanced API endpoints for COBOL analysis platform
 Clean integration of advanced features + COCO LLM integration
 """
+import io
 import os
 import json
 import logging
 import uuid
 import time
+import shutil
 from datetime import datetime
 from flask import request, jsonify, render_template_string
 from werkzeug.utils import secure_filename
 
-from app import app, db
+from app import app, db, external_service_ready
 from models import CobolProgram
 
 logger = logging.getLogger(__name__)
@@ -123,19 +125,29 @@ def api_convert_data():
         
         if conversion_type == 'cobol_to_json':
             cobol_data_file = data.get('cobol_data_file')
+            # Several data files sharing the copybook convert as one batch
+            cobol_data_files = data.get('cobol_data_files')
             copybook_content = data.get('copybook_content')
             copybook_name = data.get('copybook_name', 'copybook.cbl')
             options = data.get('options', {})
             
-            if not cobol_data_file or not copybook_content:
+            if not (cobol_data_file or cobol_data_files) or not copybook_content:
                 return jsonify({'error': 'COBOL data file and copybook content are required'}), 400
             
-            result = data_converter.convert_cobol_to_json(
-                cobol_data_file,
-                copybook_content,
-                copybook_name,
-                options=options
-            )
+            if cobol_data_files:
+                result = data_converter.convert_many(
+                    cobol_data_files,
+                    copybook_content,
+                    copybook_name,
+                    options=options
+                )
+            else:
+                result = data_converter.convert_cobol_to_json(
+                    cobol_data_file,
+                    copybook_content,
+                    copybook_name,
+                    options=options
+                )
             
         elif conversion_type == 'json_to_cobol':
             json_file = data.get('json_file')
@@ -207,6 +219,11 @@ def api_services_status():
             'data_converter': data_converter is not None,
             'llm_service': llm_service is not None
         },
+        # Reported without waiting; a service still starting up shows as False
+        'external_services': {
+            'weaviate': external_service_ready('weaviate', timeout=0),
+            'cognee': external_service_ready('cognee', timeout=0)
+        },
         'api_keys_available': {
             'groq': bool(os.environ.get('GROQ_API_KEY')),
             'perplexity': bool(os.environ.get('PERPLEXITY_API_KEY')),
@@ -228,6 +245,43 @@ def api_services_status():
     })
 
 # COCO LLM Integration Routes
+UPLOAD_COPY_CHUNK = 16 * 1024 * 1024  # bytes per sendfile call / copy buffer
+
+def _upload_fileno(stream):
+    """Return the OS file descriptor backing an upload stream, if any
+    
+    Werkzeug spools uploads under 500 KB in memory; fileno() moves such an
+    upload to its temporary file first, which is cheap at that size.
+    """
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+def _save_upload(file_storage, file_path):
+    """Save an uploaded file, letting the kernel copy it when it is already on disk"""
+    stream = file_storage.stream
+    in_fd = _upload_fileno(stream)
+    
+    with open(file_path, 'wb') as out:
+        if in_fd is not None and hasattr(os, 'sendfile'):
+            offset = stream.tell()
+            while True:
+                sent = os.sendfile(out.fileno(), in_fd, offset, UPLOAD_COPY_CHUNK)
+                if sent == 0:
+                    break
+                offset += sent
+        else:
+            shutil.copyfileobj(stream, out, 1024 * 1024)
+
+def _save_coco_job(job_data):
+    """Write a COCO job file, indexed with the analysis jobs when the LLM service is available"""
+    if llm_service is not None:
+        llm_service.save_job(job_data)
+        return
+    with open(os.path.join('uploads', f"{job_data['job_id']}.json"), 'w') as f:
+        json.dump(job_data, f)
+
 @app.route('/api/coco/upload', methods=['POST'])
 def coco_upload_cobol():
     """Enhanced COBOL file upload with COCO LLM processing"""
@@ -251,7 +305,7 @@ def coco_upload_cobol():
         job_id = str(uuid.uuid4())
         filename = secure_filename(file.filename)
         file_path = os.path.join(UPLOAD_FOLDER, f"{job_id}_{filename}")
-        file.save(file_path)
+        _save_upload(file, file_path)
 
         # Create a comprehensive job record
         job_data = {
@@ -260,13 +314,12 @@ def coco_upload_cobol():
             "file_path": file_path,
             "status": "queued",
             "created_at": time.time(),
+            "owner_pid": os.getpid(),
             "analysis_type": "coco_enhanced"
         }
-
+        
         # Store job info
-        job_file = os.path.join(UPLOAD_FOLDER, f"{job_id}.json")
-        with open(job_file, 'w') as f:
-            json.dump(job_data, f)
+        _save_coco_job(job_data)
 
         # Process with enhanced analysis
         try:
@@ -301,8 +354,7 @@ def coco_upload_cobol():
             # Update job status
             job_data['status'] = 'completed'
             job_data['completed_at'] = time.time()
-            with open(job_file, 'w') as f:
-                json.dump(job_data, f)
+            _save_coco_job(job_data)
 
             return jsonify({
                 "job_id": job_id, 
@@ -313,6 +365,9 @@ def coco_upload_cobol():
 
         except Exception as e:
             logger.error(f"COCO analysis error: {str(e)}")
+            job_data['status'] = 'failed'
+            job_data['error'] = str(e)
+            _save_coco_job(job_data)
             return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
 
     return jsonify({"error": "Invalid file type"}), 400
@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for production deployments
+
+Usage: gunicorn -c gunicorn_conf.py main:app
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Threaded workers suit the mix of I/O-bound job queries and CPU-bound uploads
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+
+# Database connections are pooled per worker. Split DB_MAX_CONNECTIONS
+# (kept under PostgreSQL's default max_connections of 100) between workers,
+# with about one pooled connection per request thread and the rest as overflow
+db_connections_per_worker = max(1, int(os.environ.get("DB_MAX_CONNECTIONS", 90)) // workers)
+os.environ.setdefault("SQLALCHEMY_POOL_SIZE", str(min(threads, db_connections_per_worker)))
+os.environ.setdefault("SQLALCHEMY_MAX_OVERFLOW", str(max(0, db_connections_per_worker - threads)))
+
+# Recycle workers periodically to bound memory growth
+max_requests = 1000
+max_requests_jitter = 100
+
+# Load the app once in the master so workers share it copy-on-write
+preload_app = True
+
+# Each worker runs CPU-bound work on its own process pool (process_pool.py);
+# split the cores between workers instead of giving every worker all of them
+os.environ.setdefault("PROCESS_POOL_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+
+def when_ready(server):
+    """Fail jobs left unfinished by a previous run, once, before workers start"""
+    from advanced_llm_service import advanced_llm_service
+    advanced_llm_service.fail_orphaned_jobs()
+
+
+def post_fork(server, worker):
+    """Reset per-process state inherited from the master process"""
+    from app import app, db, start_external_bootstrap
+    with app.app_context():
+        db.engine.dispose(close=False)
+    
+    # The master's bootstrap thread did not survive the fork
+    start_external_bootstrap(app)
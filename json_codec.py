@@ -0,0 +1,28 @@
+"""
+JSON encoding helpers: orjson when it is installed, the stdlib json
+module otherwise
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    orjson = None
+
+
+def dump_json(data: Any, indent: bool = False) -> bytes:
+    """Serialize data to JSON bytes, indented by two spaces if requested"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None).encode('utf-8')
+
+
+def load_json(raw: bytes) -> Any:
+    """Deserialize JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
@@ -1,3 +1,4 @@
+import os
 from app import app
 
 # Import enhanced routes
@@ -8,4 +9,9 @@ except Exception as e:
     print(f"⚠️ Enhanced routes not loaded: {e}")
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Jobs left unfinished by a previous run will never complete
+    from advanced_llm_service import advanced_llm_service
+    advanced_llm_service.fail_orphaned_jobs()
+    
+    # Development server only; production runs under gunicorn (gunicorn_conf.py)
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get('FLASK_ENV', 'development') == 'development')
\ No newline at end of file
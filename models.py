@@ -1,6 +1,7 @@
 from datetime import datetime
 from app import db
-from sqlalchemy import text
+from sqlalchemy import text, event, update
+from sqlalchemy.orm import Session, validates
 import json
 
 class CobolProgram(db.Model):
@@ -24,6 +25,13 @@ class CobolProgram(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    @validates('dependencies')
+    def validate_dependencies(self, key, value):
+        """Always store dependencies as a list, wrapping a bare program name"""
+        if isinstance(value, str):
+            return [value]
+        return list(value) if value else []
+    
     def to_dict(self):
         """Convert model to dictionary"""
         return {
@@ -117,7 +125,8 @@ class SystemStats(db.Model):
     total_lines_of_code = db.Column(db.Integer, default=0)
     complexity_breakdown = db.Column(db.JSON)  # {"Low": 10, "Medium": 5, "High": 2}
     dependency_count = db.Column(db.Integer, default=0)
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    common_dependencies = db.Column(db.JSON)  # [{"name": "DATEUTIL", "count": 4}, ...] top 5
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow)  # NULL once programs change
     
     def to_dict(self):
         return {
@@ -126,5 +135,26 @@ class SystemStats(db.Model):
             'total_lines_of_code': self.total_lines_of_code,
             'complexity_breakdown': self.complexity_breakdown or {},
             'dependency_count': self.dependency_count,
+            'common_dependencies': self.common_dependencies or [],
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
+
+def _mark_system_stats_stale(session):
+    """Flag the precomputed statistics as stale in the session's current transaction"""
+    session.connection().execute(update(SystemStats.__table__).values(last_updated=None))
+
+@event.listens_for(Session, 'after_flush')
+def mark_system_stats_stale(session, flush_context):
+    """Mark statistics stale once per flush that wrote programs, not once per row"""
+    for objects in (session.new, session.dirty, session.deleted):
+        if any(isinstance(obj, CobolProgram) for obj in objects):
+            _mark_system_stats_stale(session)
+            return
+
+@event.listens_for(Session, 'do_orm_execute')
+def mark_system_stats_stale_on_bulk(orm_execute_state):
+    """Bulk query.update()/delete() skip flush events, so mark statistics stale here"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ is CobolProgram for mapper in orm_execute_state.all_mappers):
+        _mark_system_stats_stale(orm_execute_state.session)
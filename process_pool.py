@@ -0,0 +1,32 @@
+"""
+Process pool shared by the CPU-bound work of one process: analysis jobs,
+directory parsing and batch data conversion
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_size() -> int:
+    """Number of worker processes in the shared pool (PROCESS_POOL_WORKERS)"""
+    return int(os.environ.get("PROCESS_POOL_WORKERS", os.cpu_count() or 1))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return this process's worker pool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Request handlers run on threads, and forking a multithreaded
+            # process can leave a child holding a lock no thread will release;
+            # forkserver starts pool processes from a clean single-threaded server
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+            else:
+                context = multiprocessing.get_context("spawn")
+            _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=context)
+        return _pool